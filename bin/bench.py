@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Build benchmarks for the static site generator.
+
+Synthesizes a corpus in the content/posts/<year>/<slug>/index.md layout and
+times generate.build_site() on it: a cold full build, a warm incremental
+build with nothing changed, and an incremental build after editing one post.
+Every build runs in a fresh process so peak memory is measured per build.
+Results are appended to a JSON file for comparison between commits.
+
+Usage:
+    bin/bench.py --posts 10000
+    bin/bench.py --posts 2000 --tables 2 --code-blocks 4 --jobs 8
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BIN_DIR = Path(__file__).parent
+ROOT_DIR = BIN_DIR.parent
+RESULTS_FILE = ROOT_DIR / ".build-cache" / "bench.json"
+
+WORDS = (
+    "cpu pipeline cache fpga microcode decoder register adder shifter bus "
+    "memory segment page descriptor interrupt prefetch queue latency cycle "
+    "clock timing verilog core board sdram dram bram lut carry multiplier "
+    "divider barrel branch opcode operand flag stack mister tang gowin retro "
+    "game console sprite tile audio video dma controller protocol uart"
+).split()
+
+# 1x1 transparent PNG, enough for asset copying
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)
+
+# Runs one build in a fresh interpreter and prints its timing as JSON
+RUNNER = """
+import contextlib, io, json, sys, time
+from pathlib import Path
+import generate
+
+root, mode, jobs = Path(sys.argv[1]), sys.argv[2], int(sys.argv[3])
+generate.CONTENT_ROOT = root / "content"
+generate.CONTENT_DIR = root / "content" / "posts"
+generate.STATIC_DIR = root / "static"
+generate.OUTPUT_DIR = root / "public"
+generate.CACHE_DIR = root / ".build-cache"
+generate.MANIFEST_FILE = generate.CACHE_DIR / "manifest.json"
+generate.COMPRESS_STATE_FILE = generate.CACHE_DIR / "compress.json"
+generate.CHANGES_FILE = generate.CACHE_DIR / "changes.json"
+
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    generate.build_site(incremental=(mode != "cold"), jobs=jobs)
+print(json.dumps({"seconds": time.perf_counter() - start, "peak_rss": generate.peak_rss()}))
+"""
+
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def paragraph(rng):
+    return words(rng, rng.randint(40, 120)).capitalize() + '.'
+
+
+def table(rng):
+    columns = rng.randint(3, 8)
+    rows = [f"| {' | '.join(words(rng, 1) for _ in range(columns))} |",
+            f"|{'---|' * columns}"]
+    for _ in range(rng.randint(5, 30)):
+        rows.append(f"| {' | '.join(str(rng.randint(0, 9999)) for _ in range(columns))} |")
+    return '\n'.join(rows)
+
+
+def code_block(rng):
+    language = rng.choice(['verilog', 'c', 'asm', 'python', ''])
+    lines = [f"    {words(rng, 2).replace(' ', '_')} = {rng.randint(0, 255)};"
+             for _ in range(rng.randint(5, 40))]
+    return f"```{language}\n" + '\n'.join(lines) + "\n```"
+
+
+def make_post(rng, args, tags, index):
+    """Return the markdown of one synthetic post and its image names."""
+    date = datetime(2010, 1, 1) + timedelta(hours=index * 7)
+    post_tags = rng.sample(tags, min(args.tags_per_post, len(tags)))
+    blocks = []
+    images = []
+    for i in range(args.images):
+        images.append(f"img{i}.png")
+        blocks.append(f"![{words(rng, 3)}](img{i}.png){{width=\"600\"}}")
+    for _ in range(args.tables):
+        blocks.append(table(rng))
+    for _ in range(args.code_blocks):
+        blocks.append(code_block(rng))
+    for i in range(args.paragraphs):
+        if i % 6 == 0:
+            blocks.append(f"## {words(rng, 4).title()}")
+        blocks.append(paragraph(rng))
+    if rng.random() < args.includes:
+        blocks.append('{{< include "../../shared/eval.md" >}}')
+    rng.shuffle(blocks)
+    blocks = [paragraph(rng), '<!--more-->'] + blocks
+
+    frontmatter = (
+        "---\n"
+        f"title: \"Post {index}: {words(rng, 5).title()}\"\n"
+        f"date: {date.isoformat()}+08:00\n"
+        "draft: false\n"
+        f"tags: [{', '.join(post_tags)}]\n"
+        "---\n\n"
+    )
+    return frontmatter + '\n\n'.join(blocks) + '\n', images
+
+
+def generate_corpus(root, args):
+    """Write a synthetic site below root. Returns the paths of all posts."""
+    rng = random.Random(args.seed)
+    content = root / "content"
+    tags = [f"tag{i}" for i in range(args.tags)]
+
+    shared = content / "posts" / "shared"
+    shared.mkdir(parents=True)
+    (shared / "eval.md").write_text(
+        "## Shared evaluation\n\n" + table(rng) + "\n\n" + paragraph(rng) + "\n",
+        encoding='utf-8',
+    )
+
+    posts = []
+    for index in range(args.posts):
+        year = 2010 + index * 7 // (24 * 365)
+        post_dir = content / "posts" / str(year) / f"post_{index:06d}"
+        post_dir.mkdir(parents=True)
+        text, images = make_post(rng, args, tags, index)
+        (post_dir / "index.md").write_text(text, encoding='utf-8')
+        for name in images:
+            (post_dir / name).write_bytes(PIXEL_PNG)
+        posts.append(post_dir / "index.md")
+
+    (content / "projects").mkdir()
+    (content / "projects" / "_index.md").write_text(
+        "---\ntitle: Projects\n---\n\n" + paragraph(rng) + "\n", encoding='utf-8')
+    (root / "static").mkdir()
+    (root / "static" / "favicon.ico").write_bytes(PIXEL_PNG)
+    return posts
+
+
+def run_build(root, mode, jobs):
+    """Run one build in a subprocess. Returns its timing and peak memory."""
+    result = subprocess.run(
+        [sys.executable, '-c', RUNNER, str(root), mode, str(jobs)],
+        cwd=BIN_DIR, check=True, capture_output=True, text=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def measure(root, posts, args):
+    """Time cold, warm and single-edit builds, repeating each args.repeat times."""
+    runs = {'cold': [], 'warm': [], 'edit': []}
+    edited = posts[len(posts) // 2]
+    for repeat in range(args.repeat):
+        shutil.rmtree(root / "public", ignore_errors=True)
+        shutil.rmtree(root / ".build-cache", ignore_errors=True)
+        runs['cold'].append(run_build(root, 'cold', args.jobs))
+        runs['warm'].append(run_build(root, 'warm', args.jobs))
+        with open(edited, 'a', encoding='utf-8') as f:
+            f.write(f"\nTypo fix {repeat}.\n")
+        runs['edit'].append(run_build(root, 'edit', args.jobs))
+
+    results = {}
+    for mode, samples in runs.items():
+        seconds = [sample['seconds'] for sample in samples]
+        peaks = [sample['peak_rss'] for sample in samples if sample['peak_rss'] is not None]
+        results[mode] = {
+            'min_seconds': min(seconds),
+            'median_seconds': statistics.median(seconds),
+            'peak_rss': max(peaks) if peaks else None,
+        }
+    return results
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def load_results(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def report(entry, previous):
+    """Print results, with the change against a previous run of the same corpus."""
+    print(f"\n{'build':<6} {'min':>10} {'median':>10} {'peak RSS':>10}  vs. {previous['commit'] if previous else '-'}")
+    for mode, result in entry['results'].items():
+        peak = f"{result['peak_rss'] / 2**20:.1f} MB" if result['peak_rss'] else "-"
+        line = f"{mode:<6} {result['min_seconds'] * 1000:8.0f}ms {result['median_seconds'] * 1000:8.0f}ms {peak:>10}"
+        if previous:
+            before = previous['results'][mode]['min_seconds']
+            line += f"  {(result['min_seconds'] - before) / before * 100:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build_site() on a synthetic corpus.")
+    parser.add_argument('--posts', type=int, default=1000, help="number of posts")
+    parser.add_argument('--paragraphs', type=int, default=20, help="body paragraphs per post")
+    parser.add_argument('--tables', type=int, default=1, help="tables per post")
+    parser.add_argument('--code-blocks', type=int, default=2, help="fenced code blocks per post")
+    parser.add_argument('--images', type=int, default=2, help="images per post")
+    parser.add_argument('--tags', type=int, default=30, help="number of distinct tags")
+    parser.add_argument('--tags-per-post', type=int, default=3, help="tags on each post")
+    parser.add_argument('--includes', type=float, default=0.1,
+                        help="fraction of posts that include a shared fragment")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the corpus")
+    parser.add_argument('--repeat', type=int, default=3, help="measurements per build type")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="passed to build_site()")
+    parser.add_argument('--output', type=Path, default=RESULTS_FILE,
+                        help=f"JSON file to append results to (default: {RESULTS_FILE})")
+    parser.add_argument('--keep', action='store_true', help="keep the generated corpus")
+    args = parser.parse_args()
+
+    params = {name: getattr(args, name) for name in (
+        'posts', 'paragraphs', 'tables', 'code_blocks', 'images', 'tags',
+        'tags_per_post', 'includes', 'seed', 'jobs',
+    )}
+    root = Path(tempfile.mkdtemp(prefix='site-bench-'))
+    try:
+        start = time.perf_counter()
+        posts = generate_corpus(root, args)
+        print(f"Generated {len(posts)} posts in {root} ({time.perf_counter() - start:.1f} s)")
+        results = measure(root, posts, args)
+    finally:
+        if args.keep:
+            print(f"Corpus kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    entry = {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'params': params,
+        'results': results,
+    }
+    history = load_results(args.output)
+    previous = next((e for e in reversed(history) if e['params'] == params), None)
+    report(entry, previous)
+
+    history.append(entry)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"\nResults appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,24 +2,97 @@
 """
 Simple static site generator for Small Things Retro blog.
 Generates a static site from markdown posts in content/posts/.
+
+Usage:
+    bin/generate.py                  full rebuild of public/
+    bin/generate.py --incremental    only rebuild outputs whose inputs changed
+    bin/generate.py --jobs N         render pages in N processes
+    bin/generate.py --working-set N  keep at most N rendered posts in memory
+    bin/generate.py --compress       also write .gz/.br/.zst copies of text files
+    bin/generate.py --fingerprint    publish assets under content-hashed names
+    bin/generate.py --minify         minify generated HTML and CSS
+    bin/generate.py --profile        report where build time goes
+    bin/generate.py serve --watch    serve public/ locally, rebuilding on changes
+    bin/generate.py check            build, then check internal links and anchors
+
+See bin/bench.py for build benchmarks on a synthetic corpus.
 """
 
+import argparse
+import cProfile
+import functools
+import gzip
+import hashlib
+import itertools
+import json
 import os
 import re
 import shutil
+import sys
+import threading
+import time
+import traceback
 import yaml
 import markdown
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
 from pathlib import Path
-from html import escape
-from urllib.parse import urljoin, urlparse
+from html import escape, unescape
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urljoin, urlparse
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Optional encoders for precompressed output; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Optional syntax highlighting; code blocks stay plain without it
+try:
+    import pygments
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.lexers.special import TextLexer
+    from pygments.util import ClassNotFound
+except ImportError:
+    pygments = None
+
+# Optional responsive images; post images are only copied without it
+try:
+    import PIL
+    from PIL import Image
+except ImportError:
+    PIL = Image = None
 
 # Configuration
 SITE_TITLE = "Small Things Retro"
 SITE_BYLINE = "Retro gaming and computing experiments by nand2mario"
 SITE_URL = "https://nand2mario.github.io"
 POSTS_PER_PAGE = 10
+SEARCH_DOCS_PER_SHARD = 500  # Posts per search result metadata file
+WORKING_SET = 500  # Posts rendered in flight at once
+WRITE_THREADS = 4  # Background threads writing outputs
+WRITE_QUEUE = 64  # Outputs waiting to be written before rendering blocks
+FEED_ITEMS = 20  # Newest posts in the site feeds and each tag's feeds
+FEED_FULL_CONTENT = False  # Full post bodies in feeds instead of excerpts
 BASE_PATH = ""  # URL prefix for the site (e.g., "/neo" or "" for root)
+STRICT_TEMPLATES = False  # Raise TemplateError on unknown or missing placeholders
+HIGHLIGHT_STYLE = "vs"  # Pygments style for css/highlight.css
+IMAGE_WIDTHS = (480, 800, 1200, 1600)  # Widths of the WebP variants of post images
+IMAGE_QUALITY = 80  # WebP quality of image variants
+CONTENT_WIDTH = 760  # Width of the post column in style.css, for <img sizes>
 
 # Giscus comments (get these values from https://giscus.app/)
 GISCUS_REPO = "nand2mario/nand2mario.github.io"
@@ -34,6 +107,102 @@ CONTENT_DIR = CONTENT_ROOT / "posts"
 STATIC_DIR = ROOT_DIR / "static"
 OUTPUT_DIR = ROOT_DIR / "public"
 TEMPLATES_DIR = ROOT_DIR / "bin" / "templates"
+CACHE_DIR = ROOT_DIR / ".build-cache"
+MANIFEST_FILE = CACHE_DIR / "manifest.json"
+CHANGES_FILE = CACHE_DIR / "changes.json"  # Outputs touched by the last build, for deploys
+
+
+class Profiler:
+    """Wall time and call counts per build phase, plus per-page render times.
+
+    Phases are timed inclusively, so a phase that runs inside another (e.g.
+    markdown conversion during RSS generation) is counted in both. Phases
+    timed on background threads, like file writes, overlap the others.
+    Recording only happens while enabled, which main() does for --profile.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.phases = {}  # name -> [calls, seconds]
+        self.pages = []  # (seconds, label)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one call of the named phase."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator timing every call of a function as the named phase."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.phase(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add(self, name, seconds, calls=1):
+        with self.lock:
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def page(self, label, seconds):
+        """Record how long an output page took to render."""
+        if self.enabled:
+            self.pages.append((seconds, label))
+
+    def results(self, wall_time, slowest=10):
+        """Profile data as a JSON-serializable dict."""
+        return {
+            'wall_time': wall_time,
+            'peak_rss': peak_rss(),
+            'phases': {
+                name: {'calls': calls, 'seconds': seconds}
+                for name, (calls, seconds) in sorted(self.phases.items(), key=lambda kv: -kv[1][1])
+            },
+            'slowest_pages': [
+                {'page': label, 'seconds': seconds}
+                for seconds, label in sorted(self.pages, reverse=True)[:slowest]
+            ],
+        }
+
+    def report(self, wall_time, slowest=10):
+        """Print a summary of the recorded phases and slowest pages."""
+        results = self.results(wall_time, slowest)
+        print(f"\nProfile: {wall_time * 1000:.0f} ms wall time", end="")
+        if results['peak_rss'] is not None:
+            print(f", peak memory {format_size(results['peak_rss'])}", end="")
+        print()
+        for name, phase in results['phases'].items():
+            print(f"  {name:<20} {phase['seconds'] * 1000:9.1f} ms  {phase['calls']:6d} calls")
+        if results['slowest_pages']:
+            print(f"Slowest {len(results['slowest_pages'])} pages:")
+            for entry in results['slowest_pages']:
+                print(f"  {entry['seconds'] * 1000:9.1f} ms  {entry['page']}")
+
+
+PROFILER = Profiler()
+
+
+def peak_rss():
+    """Peak resident set size of this process and its workers in bytes, if known."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
 
 
 def parse_frontmatter(content):
@@ -47,10 +216,133 @@ def parse_frontmatter(content):
     return {}, content
 
 
-def expand_markdown_includes(content, base_dir, seen=None):
-    """Expand local {{< include "file.md" >}} directives recursively."""
+def read_frontmatter(path):
+    """Parse only the YAML frontmatter of a markdown file.
+
+    Reads up to the closing --- and no further, so building the post index
+    does not load post bodies.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.readline()
+        if not head.startswith('---'):
+            return {}
+        start = 3
+        while True:
+            end = head.find('---', start)
+            if end != -1:
+                return yaml.safe_load(head[3:end]) or {}
+            line = f.readline()
+            if not line:
+                # No closing marker: the whole file is body, as in parse_frontmatter
+                return {}
+            start = max(3, len(head) - 2)
+            head += line
+
+
+INCLUDE_DIRECTIVE = re.compile(r'\{\{<\s*include\s+["\']([^"\']+)["\']\s*>\}\}')
+MORE_MARKER = re.compile(r'<!--\s*more\s*-->', flags=re.IGNORECASE)
+HTML_COMMENT = re.compile(r'<!--.*?-->', flags=re.DOTALL)
+FIRST_PARAGRAPH = re.compile(r'<p>(.*?)</p>', flags=re.DOTALL)
+WHITESPACE = re.compile(r'\s+')
+MORE_LINE = re.compile(r'^<!--\s*more\s*-->[ \t]*$', flags=re.IGNORECASE | re.MULTILINE)
+FENCE = re.compile(r'^ {0,3}(?:`{3,}|~{3,})', flags=re.MULTILINE)
+REFERENCE_DEFINITION = re.compile(r'^ {0,3}\[[^\]]+\]:', flags=re.MULTILINE)
+HTML_BLOCK_TAG = re.compile(r'<(/?)(div|table|figure|details|section|blockquote|pre|ul|ol|p|center)\b',
+                            flags=re.IGNORECASE)
+BLANK_LINES = re.compile(r'\n[ \t]*\n')
+# Blocks that may render differently when cut off from what follows them
+COMPLEX_BLOCK = re.compile(r'\s|[>|<`~]|[-*+][ \t]|\d+[.)][ \t]')
+HTML_TAG = re.compile(r'<[^>]+>')
+URL_ATTR = re.compile(r'(srcset|src|href)="([^"]+)"')
+
+
+class IncludeGraph:
+    """Markdown fragments pulled in by {{< include >}}, and the posts using them.
+
+    Fragment bodies are cached by path and modification time, so a fragment
+    shared by many posts is read once. The graph maps each post's index file
+    to every fragment it includes, directly or through other fragments, so a
+    changed fragment invalidates exactly the posts that include it.
+    """
+
+    def __init__(self):
+        self.fragments = {}  # fragment path -> (stat, body)
+        self.dependencies = {}  # index file -> frozenset of fragment paths
+        self.body_hashes = {}  # index file -> (stamp, hash of expanded body)
+
+    def fragment(self, path):
+        """Return the body of a fragment, without its frontmatter."""
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self.fragments.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        _, body = parse_frontmatter(path.read_text(encoding='utf-8'))
+        self.fragments[path] = (key, body)
+        return body
+
+    def record(self, index_file, fragments):
+        self.dependencies[index_file] = frozenset(fragments)
+
+    def includers(self, path):
+        """Index files of the posts that include path."""
+        path = Path(path).resolve()
+        return sorted(index_file for index_file, fragments in self.dependencies.items()
+                      if path in fragments)
+
+    def invalidate(self, path):
+        """Forget a changed fragment. Returns the index files that include it."""
+        path = Path(path).resolve()
+        self.fragments.pop(path, None)
+        includers = self.includers(path)
+        for index_file in includers:
+            self.body_hashes.pop(index_file, None)
+        return includers
+
+    def stamp(self, index_file):
+        """Modification times of a post and its known fragments, or None."""
+        stamp = []
+        try:
+            for path in (index_file, *sorted(self.dependencies.get(index_file, ()))):
+                stat = path.stat()
+                stamp.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            return None
+        return tuple(stamp)
+
+    def body_hash(self, post):
+        """Hash of a post's expanded body, re-read only if it or a fragment changed."""
+        before = self.stamp(post.index_file)
+        cached = self.body_hashes.get(post.index_file)
+        if before is not None and cached is not None and cached[0] == before:
+            return cached[1]
+        digest = hash_text(load_post_body(post))
+        # Only trust the stamp if nothing changed while the post was read
+        if before is not None and self.stamp(post.index_file) == before:
+            self.body_hashes[post.index_file] = (before, digest)
+        return digest
+
+    def retain(self, posts):
+        """Drop the graph entries of posts that no longer exist."""
+        index_files = {post.index_file for post in posts}
+        for table in (self.dependencies, self.body_hashes):
+            for index_file in table.keys() - index_files:
+                del table[index_file]
+
+    def stats(self):
+        shared = sum(1 for fragments in self.dependencies.values() if fragments)
+        return f"{len(self.fragments)} fragments included by {shared} posts"
+
+
+INCLUDES = IncludeGraph()
+
+
+def expand_markdown_includes(content, base_dir, seen=None, included=None):
+    """Expand local {{< include "file.md" >}} directives recursively.
+
+    The resolved path of every expanded fragment is added to included.
+    """
     seen = set() if seen is None else seen
-    pattern = re.compile(r'\{\{<\s*include\s+["\']([^"\']+)["\']\s*>\}\}')
 
     def include(match):
         path = (base_dir / match.group(1)).resolve()
@@ -58,54 +350,133 @@ def expand_markdown_includes(content, base_dir, seen=None):
             raise ValueError(f"recursive markdown include: {path}")
         if not path.is_file():
             raise FileNotFoundError(f"markdown include not found: {path}")
-        included = path.read_text(encoding='utf-8')
-        _, body = parse_frontmatter(included)
-        return expand_markdown_includes(body, path.parent, seen | {path})
+        if included is not None:
+            included.add(path)
+        return expand_markdown_includes(INCLUDES.fragment(path), path.parent, seen | {path}, included)
 
-    return pattern.sub(include, content)
+    return INCLUDE_DIRECTIVE.sub(include, content)
 
 
+@PROFILER.timed('excerpt extraction')
 def get_excerpt(html_content, max_chars=300):
     """Extract excerpt from HTML content. Returns HTML if <!--more--> marker exists."""
     # Check for <!--more--> marker and use content before it
-    more_match = re.search(r'<!--\s*more\s*-->', html_content, flags=re.IGNORECASE)
+    more_match = MORE_MARKER.search(html_content)
     if more_match:
         # Return HTML content before <!--more-->, preserving formatting
         excerpt = html_content[:more_match.start()]
         # Remove any other HTML comments
-        excerpt = re.sub(r'<!--.*?-->', '', excerpt, flags=re.DOTALL)
+        excerpt = HTML_COMMENT.sub('', excerpt)
         return excerpt.strip()
 
     # No <!--more--> marker - use first paragraph
     # Remove HTML comments first
-    clean_content = re.sub(r'<!--.*?-->', '', html_content, flags=re.DOTALL)
-    first_p = re.search(r'<p>(.*?)</p>', clean_content, flags=re.DOTALL)
+    clean_content = HTML_COMMENT.sub('', html_content)
+    first_p = FIRST_PARAGRAPH.search(clean_content)
     if first_p:
         return f'<p>{first_p.group(1)}</p>'
 
     # Fall back to plain text truncation
-    text = re.sub(r'<[^>]+>', '', clean_content)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = HTML_TAG.sub('', clean_content)
+    text = WHITESPACE.sub(' ', text).strip()
     if len(text) > max_chars:
         text = text[:max_chars].rsplit(' ', 1)[0] + '...'
     return text
 
 
+def closes_blocks(prefix):
+    """Whether a markdown prefix ends outside any fenced or HTML block."""
+    if len(FENCE.findall(prefix)) % 2 or 'markdown=' in prefix:
+        return False
+    depth = {}
+    for match in HTML_BLOCK_TAG.finditer(prefix):
+        tag = match.group(2).lower()
+        depth[tag] = depth.get(tag, 0) + (-1 if match.group(1) else 1)
+    return not any(depth.values())
+
+
+def excerpt_source(body):
+    """Return the start of a markdown body that renders into its excerpt.
+
+    That is the text up to the <!--more--> line, or else up to the first
+    paragraph. Returns None when the prefix may render differently on its
+    own than at the start of the whole post: when it ends inside a fenced
+    block or an HTML block, or the post uses reference links or [TOC].
+    """
+    if REFERENCE_DEFINITION.search(body) or '[TOC]' in body:
+        return None
+    marker = MORE_LINE.search(body)
+    if marker:
+        prefix = body[:marker.end()]
+        return prefix if closes_blocks(prefix) else None
+    if MORE_MARKER.search(body):
+        return None  # a marker inside a line or block
+
+    # Leading headings and comments, then the first paragraph
+    blocks = []
+    for block in BLANK_LINES.split(body.strip('\n')):
+        if HTML_COMMENT.fullmatch(block):
+            blocks.append(block)
+            continue
+        if COMPLEX_BLOCK.match(block):
+            return None
+        blocks.append(block)
+        if not block.startswith('#'):
+            prefix = '\n\n'.join(blocks) + '\n'
+            return prefix if closes_blocks(prefix) else None
+    return None
+
+
 def rebase_excerpt_urls(html_content, post_url):
     """Make relative URLs in post excerpts work when rendered on listing pages."""
     base_url = f"{BASE_PATH}{post_url}"
 
-    def rebase_attr(match):
-        attr = match.group(1)
-        url = match.group(2)
-        parsed = urlparse(url)
-        if parsed.scheme or url.startswith(("/", "#")):
-            return match.group(0)
-        return f'{attr}="{urljoin(base_url, url)}"'
+    def rebase(url):
+        if urlparse(url).scheme or url.startswith(("/", "#")):
+            return url
+        return urljoin(base_url, url)
 
-    return re.sub(r'(src|href)="([^"]+)"', rebase_attr, html_content)
+    return rewrite_url_attrs(html_content, rebase)
 
 
+def rewrite_url_attrs(html_content, rewrite):
+    """Replace each URL in src, href and srcset attributes with rewrite(url)."""
+    def rewrite_attr(match):
+        attr = match.group(1)
+        value = match.group(2)
+        if attr == 'srcset':
+            # Comma-separated candidates of a URL and a width or density
+            candidates = [candidate.strip().split(' ', 1) for candidate in value.split(',')]
+            value = ', '.join(' '.join([rewrite(url), *rest]) for url, *rest in candidates)
+        else:
+            value = rewrite(value)
+        return f'{attr}="{value}"'
+
+    return URL_ATTR.sub(rewrite_attr, html_content)
+
+
+@dataclass(slots=True, eq=False)
+class Post:
+    """Metadata of a post. The body is loaded on demand by load_post_body()."""
+
+    path: Path  # directory holding the post and its assets
+    index_file: Path
+    year: str | None
+    slug: str
+    url: str
+    title: str = ""
+    date: object = None  # frontmatter value, see date_obj
+    draft: bool = False
+    author: str = ""
+    tags: list = field(default_factory=list)
+    date_obj: datetime | None = None
+    date_formatted: str = ""
+    updated: datetime | None = None  # lastmod in the frontmatter, else date_obj
+    fingerprint: str = ""  # set by the build, see post_fingerprint()
+    position: int | None = None  # index among published posts, newest first
+
+
+@PROFILER.timed('collect_posts')
 def collect_posts():
     """Collect all posts from content/posts directory."""
     posts = []
@@ -122,78 +493,87 @@ def collect_posts():
                     # Directory-based post with index.md
                     index_file = item / "index.md"
                     if index_file.exists():
-                        posts.append({
-                            'path': item,
-                            'index_file': index_file,
-                            'year': year_dir.name,
-                            'slug': item.name,
-                            'url': f"/posts/{year_dir.name}/{item.name}/"
-                        })
+                        posts.append(Post(
+                            path=item,
+                            index_file=index_file,
+                            year=year_dir.name,
+                            slug=item.name,
+                            url=f"/posts/{year_dir.name}/{item.name}/"
+                        ))
                 elif item.is_file() and item.suffix == '.md':
                     # Standalone .md file
                     slug = item.stem
-                    posts.append({
-                        'path': year_dir,
-                        'index_file': item,
-                        'year': year_dir.name,
-                        'slug': slug,
-                        'url': f"/posts/{year_dir.name}/{slug}/"
-                    })
+                    posts.append(Post(
+                        path=year_dir,
+                        index_file=item,
+                        year=year_dir.name,
+                        slug=slug,
+                        url=f"/posts/{year_dir.name}/{slug}/"
+                    ))
         else:
             # Legacy posts without year
             if year_dir.is_dir():
                 index_file = year_dir / "index.md"
                 if index_file.exists():
-                    posts.append({
-                        'path': year_dir,
-                        'index_file': index_file,
-                        'year': None,
-                        'slug': year_dir.name,
-                        'url': f"/posts/{year_dir.name}/"
-                    })
-
-    # Parse frontmatter for each post
+                    posts.append(Post(
+                        path=year_dir,
+                        index_file=index_file,
+                        year=None,
+                        slug=year_dir.name,
+                        url=f"/posts/{year_dir.name}/"
+                    ))
+
+    # Parse frontmatter for each post; bodies are loaded when rendered
     for post in posts:
-        with open(post['index_file'], 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        frontmatter, body = parse_frontmatter(content)
-        post['title'] = frontmatter.get('title', post['slug'])
-        post['date'] = frontmatter.get('date')
-        post['draft'] = frontmatter.get('draft', False)
-        post['author'] = frontmatter.get('author', 'nand2mario')
-        post['tags'] = [str(t) for t in frontmatter.get('tags', [])]
-        post['body'] = expand_markdown_includes(body, post['index_file'].parent)
-
-        # Parse date (normalize to naive datetime for comparison)
-        if isinstance(post['date'], str):
-            # Handle ISO format with timezone
-            date_str = post['date'].split('T')[0]
-            post['date_obj'] = datetime.strptime(date_str, '%Y-%m-%d')
-        elif isinstance(post['date'], datetime):
-            # Convert to naive datetime if timezone-aware
-            if post['date'].tzinfo is not None:
-                post['date_obj'] = post['date'].replace(tzinfo=None)
-            else:
-                post['date_obj'] = post['date']
-        else:
-            post['date_obj'] = datetime.now()
-
-        post['date_formatted'] = post['date_obj'].strftime('%B %d, %Y')
+        frontmatter = read_frontmatter(post.index_file)
+        post.title = frontmatter.get('title', post.slug)
+        post.date = frontmatter.get('date')
+        post.draft = frontmatter.get('draft', False)
+        post.author = frontmatter.get('author', 'nand2mario')
+        post.tags = [str(t) for t in frontmatter.get('tags', [])]
+        post.date_obj = parse_date(post.date) or datetime.now()
+        post.date_formatted = post.date_obj.strftime('%B %d, %Y')
+        post.updated = max(parse_date(frontmatter.get('lastmod')) or post.date_obj, post.date_obj)
 
     # Sort by date (newest first)
-    posts.sort(key=lambda x: x['date_obj'], reverse=True)
+    posts.sort(key=lambda x: x.date_obj, reverse=True)
 
     return posts
 
 
+def parse_date(value):
+    """Parse a frontmatter date. Returns a naive datetime, or None."""
+    if isinstance(value, str):
+        # Handle ISO format with timezone
+        date_str = value.split('T')[0]
+        return datetime.strptime(date_str, '%Y-%m-%d')
+    if isinstance(value, datetime):
+        # Convert to naive datetime if timezone-aware
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return None
+
+
+def load_post_body(post):
+    """Read the markdown body of a post, with includes expanded."""
+    with open(post.index_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    _, body = parse_frontmatter(content)
+    included = set()
+    with PROFILER.phase('include expansion'):
+        body = expand_markdown_includes(body, post.index_file.parent, included=included)
+    INCLUDES.record(post.index_file, included)
+    return body
+
+
 def collect_tags(posts):
     """Collect all tags and their associated posts."""
     tags = {}
     for post in posts:
-        if post['draft']:
+        if post.draft:
             continue
-        for tag in post.get('tags', []):
+        for tag in post.tags:
             if tag not in tags:
                 tags[tag] = []
             tags[tag].append(post)
@@ -243,60 +623,440 @@ def collect_pages():
     return pages
 
 
-def render_markdown(content, post_url=""):
-    """Convert markdown to HTML."""
-    # Handle image references with optional attributes like {width="800"}
-    # Convert to HTML img tags with attributes
-    def fix_image_with_attrs(match):
-        alt = match.group(1)
-        src = match.group(2)
-        attrs_str = match.group(3)
-        # Parse attributes like width="400"
-        attrs = re.findall(r'(\w+)=["\']([^"\']+)["\']', attrs_str)
-        attr_html = ' '.join(f'{k}="{v}"' for k, v in attrs)
-        return f'<img src="{src}" alt="{alt}" {attr_html}>'
-
-    content = re.sub(r'!\[([^\]]*)\]\(([^)]+)\)\s*\{([^}]*)\}', fix_image_with_attrs, content)
-
-    # Convert markdown to HTML
-    md = markdown.Markdown(extensions=['fenced_code', 'tables', 'toc', 'md_in_html'])
-    html = md.convert(content)
-
-    # Wrap markdown-generated tables so small tables can stay compact while
-    # wider ones scroll horizontally instead of breaking the layout.
-    html = re.sub(
-        r'(<table>.*?</table>)',
-        r'<div class="table-wrap">\1</div>',
-        html,
-        flags=re.DOTALL,
-    )
-
-    # Prefix absolute paths with BASE_PATH (for images and links)
-    # e.g., src="/2025/img.webp" -> src="/neo/2025/img.webp"
-    html = re.sub(r'(src|href)="/([^"]+)"', rf'\1="{BASE_PATH}/\2"', html)
-
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'toc', 'md_in_html']
+IMAGE_WITH_ATTRS = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)\s*\{([^}]*)\}')
+IMAGE_ATTR = re.compile(r'(\w+)=["\']([^"\']+)["\']')
+TABLE = re.compile(r'<table>.*?</table>', flags=re.DOTALL)
+ABSOLUTE_URL_ATTR = re.compile(r'(src|href)="/([^"]+)"')
+TABLE_OR_ABSOLUTE_URL = re.compile(rf'{TABLE.pattern}|{ABSOLUTE_URL_ATTR.pattern}', flags=re.DOTALL)
+
+CODE_BLOCK = re.compile(r'<pre><code class="language-([^"]+)">(.*?)</code></pre>', flags=re.DOTALL)
+# Fence labels used in posts that Pygments knows by another name
+LEXER_ALIASES = {'asm': 'nasm', 'assembly': 'nasm'}
+
+# One configured Markdown instance per thread; worker processes get their own
+_converters = threading.local()
+
+
+def markdown_converter():
+    """Return this thread's Markdown instance, reset for a new document."""
+    md = getattr(_converters, 'md', None)
+    if md is None:
+        md = _converters.md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return md.reset()
+
+
+def fix_image_with_attrs(match):
+    """Turn ![alt](src){width="400"} into an <img> tag with those attributes."""
+    alt = match.group(1)
+    src = match.group(2)
+    attrs = IMAGE_ATTR.findall(match.group(3))
+    attr_html = ' '.join(f'{k}="{v}"' for k, v in attrs)
+    return f'<img src="{src}" alt="{alt}" {attr_html}>'
+
+
+@functools.lru_cache(maxsize=None)
+def code_lexer(language):
+    """Pygments lexer for a fence label, or None to leave the block plain."""
+    try:
+        lexer = get_lexer_by_name(LEXER_ALIASES.get(language, language),
+                                  stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+    return None if isinstance(lexer, TextLexer) else lexer
+
+
+@functools.lru_cache(maxsize=4096)
+@PROFILER.timed('syntax highlighting')
+def highlight_code(language, code):
+    """Highlighted HTML of a code block.
+
+    Results are cached on disk by language, code and Pygments version, so
+    unchanged blocks are never highlighted again in later builds.
+    """
+    key = hash_text(LEXER_ALIASES.get(language, language), code, pygments.__version__)
+    path = CACHE_DIR / 'highlight' / f"{key}.html"
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        # Mark the entry as used, also from worker processes, for prune_highlight_cache()
+        os.utime(path)
+        return html
+    except OSError:
+        pass
+    html = pygments.highlight(code, code_lexer(language), HtmlFormatter(nowrap=True))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Worker processes may write the same block; replace atomically
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(tmp_path, path)
     return html
 
 
+def prune_highlight_cache(started):
+    """Drop highlighted blocks not used since started. Only valid after a full build."""
+    cache_dir = CACHE_DIR / 'highlight'
+    if cache_dir.exists():
+        for path in cache_dir.iterdir():
+            # Allow for file systems with coarse timestamps
+            if path.stat().st_mtime < started - 2:
+                path.unlink()
+
+
+def highlight_block(match):
+    language = match.group(1)
+    if code_lexer(language) is None:
+        return match.group(0)
+    html = highlight_code(language, unescape(match.group(2)))
+    return f'<pre class="highlight"><code class="language-{language}">{html}</code></pre>'
+
+
+def highlight_css():
+    """Stylesheet for the code blocks highlighted by highlight_code()."""
+    if pygments is None:
+        return ""
+    rules = HtmlFormatter(style=HIGHLIGHT_STYLE).get_token_style_defs('.highlight')
+    # Lexers flag what they cannot parse, e.g. in microcode listings; don't box it in red
+    return '\n'.join(rule for rule in rules if not rule.startswith('.highlight .err ')) + '\n'
+
+
+IMG_TAG = re.compile(r'<img\b[^>]*>')
+TAG_ATTR = re.compile(r'([\w-]+)="([^"]*)"')
+
+
+def responsive_img(match, images):
+    """Add srcset, intrinsic size and lazy loading to an <img> of a post image."""
+    tag = match.group(0)
+    attrs = dict(TAG_ATTR.findall(tag))
+    src = attrs.get('src')
+    path = images.get(unquote(src)) if src else None
+    size = image_size(path) if path and 'srcset' not in attrs else None
+    if size is None:
+        return tag
+
+    width, height = size
+    display_width = width
+    extra = {}
+    if 'width' not in attrs:
+        extra['width'] = width
+        extra['height'] = height
+    elif attrs['width'].isdigit():
+        display_width = int(attrs['width'])
+        if 'height' not in attrs:
+            extra['height'] = round(height * display_width / width)
+    display_width = min(display_width, CONTENT_WIDTH)
+    candidates = [f"{variant_name(src, w)} {w}w" for w in variant_widths(width)]
+    extra['srcset'] = ', '.join(candidates + [f"{src} {width}w"])
+    extra['sizes'] = f"(max-width: {display_width + 40}px) calc(100vw - 40px), {display_width}px"
+    if 'loading' not in attrs:
+        extra['loading'] = 'lazy'
+
+    end = ' />' if tag.endswith('/>') else '>'
+    head = tag[:-len(end.strip())].rstrip()
+    return head + ''.join(f' {k}="{v}"' for k, v in extra.items()) + end
+
+
+def prefix_base_path(match):
+    return f'{match.group(1)}="{BASE_PATH}/{match.group(2)}"'
+
+
+def postprocess_html(match):
+    """Wrap a table, or prefix an absolute src/href with BASE_PATH."""
+    if match.lastindex:
+        return prefix_base_path(match)
+    table = match.group(0)
+    if BASE_PATH:
+        table = ABSOLUTE_URL_ATTR.sub(prefix_base_path, table)
+    return f'<div class="table-wrap">{table}</div>'
+
+
+@PROFILER.timed('markdown conversion')
+def render_markdown(content, post_url="", images=None):
+    """Convert markdown to HTML.
+
+    images maps the file names of a post's images to their source paths;
+    <img> tags showing them get a srcset of the variants from ImageVariants.
+    """
+    # Image references with optional attributes like {width="800"} must become
+    # <img> tags before conversion, since markdown would not keep the attributes
+    content = IMAGE_WITH_ATTRS.sub(fix_image_with_attrs, content)
+    html = markdown_converter().convert(content)
+    if pygments is not None:
+        html = CODE_BLOCK.sub(highlight_block, html)
+    if images:
+        html = IMG_TAG.sub(lambda match: responsive_img(match, images), html)
+
+    # A single pass over the HTML wraps tables, so small tables can stay compact
+    # while wider ones scroll horizontally, and prefixes absolute paths with
+    # BASE_PATH: src="/2025/img.webp" -> src="/neo/2025/img.webp"
+    if BASE_PATH:
+        return TABLE_OR_ABSOLUTE_URL.sub(postprocess_html, html)
+    return TABLE.sub(postprocess_html, html)
+
+
+class RenderCache:
+    """Cache of rendered post HTML and of the summaries derived from it.
+
+    Post pages, listing pages, tag pages, feeds and the search index
+    all need the same rendered body, so each post is converted once and
+    shared by every page. Bodies are loaded from disk only when a post is
+    rendered, and the full HTML is only kept until summarize(), which keeps
+    the excerpts listing pages need, saves the search terms to the on-disk
+    term cache and drops the rest, so only small per-post fragments stay in
+    memory as the archive grows.
+
+    Entries are keyed by source file, post URL, BASE_PATH and the post
+    fingerprint, the inputs that affect the rendered output, so the dev
+    server can keep one cache across rebuilds.
+    """
+
+    EXCERPT_SIZES = (300, 500)  # listing pages and feeds
+
+    def __init__(self):
+        self.html_cache = {}
+        self.excerpt_cache = {}
+        self.summarized = set()
+        self.preview_cache = {}
+        self.feed_cache = {}
+        self.feed_keys = set()  # posts that appear in a feed
+        self.feed_assets = None
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, post):
+        return (post.index_file, post.url, BASE_PATH, post.fingerprint)
+
+    def html(self, post):
+        """Return the rendered HTML body of a post."""
+        key = self._key(post)
+        if key in self.html_cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.html_cache[key] = render_markdown(load_post_body(post), post.url, post_images(post))
+        return self.html_cache[key]
+
+    def store(self, post, html):
+        """Add HTML rendered elsewhere (e.g. in a worker process)."""
+        self.misses += 1
+        self.html_cache[self._key(post)] = html
+
+    def summarize(self, post):
+        """Derive the excerpts and search terms of a post, then drop its HTML."""
+        for max_chars in self.EXCERPT_SIZES:
+            self.excerpt(post, max_chars)
+        save_search_terms(post, post_search_terms(post, self.html(post)))
+        if self._key(post) in self.feed_keys:
+            for kind in FEED_ENTRIES:
+                self.feed_entry(post, kind)
+        self.summarized.add(self._key(post))
+        self.html_cache.pop(self._key(post), None)
+
+    def prefetch(self, posts, mapper=map):
+        """Summarize all posts that are not summarized yet, using mapper to fan out."""
+        missing = {}
+        for post in posts:
+            key = self._key(post)
+            if key not in self.summarized:
+                missing.setdefault(key, post)
+        missing = list(missing.values())
+        for post, html in zip(missing, mapper(render_post_body, missing)):
+            self.store(post, html)
+            self.summarize(post)
+
+    def prefetch_excerpts(self, posts, mapper=map):
+        """Extract the excerpts of posts that have none yet, for listing pages.
+
+        Where it is safe, only the start of a post is rendered, so listings
+        cost about the size of the excerpts rather than of the posts.
+        """
+        missing = {}
+        full = []
+        for post in posts:
+            key = self._key(post)
+            if key in self.summarized or key + (self.EXCERPT_SIZES[0],) in self.excerpt_cache:
+                continue
+            if FEED_FULL_CONTENT and key in self.feed_keys:
+                full.append(post)  # its feed entries need the whole post
+            else:
+                missing.setdefault(key, post)
+        missing = list(missing.values())
+        with PROFILER.phase('excerpt rendering'):
+            excerpts = list(mapper(render_post_excerpt, missing))
+        for post, excerpt in zip(missing, excerpts):
+            if excerpt is None:
+                full.append(post)
+                continue
+            self.misses += 1
+            # Excerpts cut at <!--more--> or a paragraph do not depend on max_chars
+            for max_chars in self.EXCERPT_SIZES:
+                self.excerpt_cache[self._key(post) + (max_chars,)] = excerpt
+        self.prefetch(full, mapper)
+
+    def excerpt(self, post, max_chars=300):
+        """Return the excerpt of a post, extracted from its cached HTML."""
+        key = self._key(post) + (max_chars,)
+        if key in self.excerpt_cache:
+            self.hits += 1
+        else:
+            self.excerpt_cache[key] = get_excerpt(self.html(post), max_chars)
+        return self.excerpt_cache[key]
+
+    def preview(self, post):
+        """Return the listing preview of a post, shared by all listing pages."""
+        key = self._key(post)
+        if key in self.preview_cache:
+            self.hits += 1
+        else:
+            self.preview_cache[key] = post_preview(post, self)
+        return self.preview_cache[key]
+
+    def plan_feeds(self, posts):
+        """Note the posts shown in feeds, so summarize() keeps their entries."""
+        self.feed_keys = {self._key(post) for post in posts}
+        # Entries link to assets, whose names change with --fingerprint
+        if self.feed_assets != ASSET_URLS.digest():
+            self.feed_assets = ASSET_URLS.digest()
+            self.feed_cache = {}
+
+    def feed_entry(self, post, kind):
+        """Return the feed entry of a post in the given format.
+
+        Entries are built once per post and shared by the site feeds and
+        the feeds of each of its tags.
+        """
+        key = self._key(post) + (kind,)
+        if key in self.feed_cache:
+            self.hits += 1
+        else:
+            html_content = self.html(post) if FEED_FULL_CONTENT else self.excerpt(post, 500)
+            self.feed_cache[key] = FEED_ENTRIES[kind](post, feed_content(post, html_content))
+        return self.feed_cache[key]
+
+    def retain(self, posts):
+        """Drop entries for anything but the given posts, and reset counters."""
+        keys = {self._key(post) for post in posts}
+        self.html_cache = {k: v for k, v in self.html_cache.items() if k in keys}
+        self.excerpt_cache = {k: v for k, v in self.excerpt_cache.items() if k[:-1] in keys}
+        self.summarized &= keys
+        self.preview_cache = {k: v for k, v in self.preview_cache.items() if k in keys}
+        self.feed_cache = {k: v for k, v in self.feed_cache.items() if k[:-1] in keys}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return a one-line summary of cache usage."""
+        return f"{self.misses} markdown conversions, {self.hits} cache hits"
+
+
+def map_chunk(fn, chunk):
+    return [fn(*args) for args in chunk]
+
+
+def bounded_map(executor, window, fn, *iterables, chunksize=4):
+    """Like executor.map(), with at most window calls submitted but not yet consumed.
+
+    executor.map() submits every call up front and buffers their results,
+    so the output of a whole build could pile up while it is written out.
+    """
+    args = zip(*iterables)
+    pending = deque()
+    while chunk := list(itertools.islice(args, chunksize)):
+        if len(pending) * chunksize >= window:
+            yield from pending.popleft().result()
+        pending.append(executor.submit(map_chunk, fn, chunk))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def render_post_body(post):
+    """Load and render the body of a post. Runs in worker processes."""
+    return render_markdown(load_post_body(post), post.url, post_images(post))
+
+
+def render_post_excerpt(post):
+    """Render only the part of a post its excerpt comes from. Runs in worker processes.
+
+    Returns the excerpt, or None if it needs the whole post; see excerpt_source().
+    """
+    source = excerpt_source(load_post_body(post))
+    if source is None:
+        return None
+    html_content = render_markdown(source, post.url, post_images(post))
+    if not (MORE_MARKER.search(html_content) or FIRST_PARAGRAPH.search(html_content)):
+        return None
+    return get_excerpt(html_content)
+
+
+class TemplateError(ValueError):
+    """Raised when template placeholders and supplied values do not match."""
+
+
+class Template:
+    """A template compiled into literal segments and {{variable}} placeholders.
+
+    Rendering joins the segments with the supplied values in a single pass,
+    instead of scanning and copying the whole template once per variable.
+    """
+
+    PLACEHOLDER = re.compile(r'\{\{(\w+)\}\}')
+
+    def __init__(self, source, name="<string>"):
+        self.name = name
+        self.segments = []  # literal text and placeholder names, alternating
+        pos = 0
+        for match in self.PLACEHOLDER.finditer(source):
+            self.segments.append(source[pos:match.start()])
+            self.segments.append(match.group(1))
+            pos = match.end()
+        self.segments.append(source[pos:])
+        self.placeholders = frozenset(self.segments[1::2])
+
+    @PROFILER.timed('template rendering')
+    def render(self, values, strict=False):
+        """Fill in placeholders from values.
+
+        Placeholders without a value are left as they are and values without
+        a placeholder are ignored, unless strict is set, which raises
+        TemplateError for either.
+        """
+        if strict:
+            missing = self.placeholders - values.keys()
+            unknown = values.keys() - self.placeholders
+            if missing or unknown:
+                raise TemplateError(
+                    f"template {self.name}: missing values for {sorted(missing)}, "
+                    f"unknown placeholders {sorted(unknown)}"
+                )
+        segments = self.segments
+        parts = [segments[0]]
+        for i in range(1, len(segments), 2):
+            name = segments[i]
+            parts.append(str(values[name]) if name in values else f"{{{{{name}}}}}")
+            parts.append(segments[i + 1])
+        return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=None)
 def load_template(name):
-    """Load a template file."""
+    """Load and compile a template file. Templates are read once per build."""
     template_file = TEMPLATES_DIR / f"{name}.html"
     with open(template_file, 'r', encoding='utf-8') as f:
-        return f.read()
+        return Template(f.read(), name)
 
 
 def render_template(template, **kwargs):
     """Simple template rendering with {{variable}} syntax."""
-    result = template
-    for key, value in kwargs.items():
-        result = result.replace(f"{{{{{key}}}}}", str(value))
-    return result
+    if not isinstance(template, Template):
+        template = Template(template)
+    return template.render(kwargs, strict=STRICT_TEMPLATES)
 
 
-def generate_post_page(post, prev_post=None, next_post=None):
+def generate_post_page(post, cache, prev_post=None, next_post=None):
     """Generate HTML page for a single post."""
     # Render markdown content
-    html_content = render_markdown(post['body'], post['url'])
+    html_content = cache.html(post)
 
     # Load templates
     base_template = load_template('base')
@@ -306,33 +1066,33 @@ def generate_post_page(post, prev_post=None, next_post=None):
     nav_links = []
     if prev_post:
         nav_links.append(
-            f'<a href="{BASE_PATH}{prev_post["url"]}" class="prev-post">'
+            f'<a href="{BASE_PATH}{prev_post.url}" class="prev-post">'
             f'<span>Newer post</span>'
-            f'<strong>← {escape(prev_post["title"])}</strong>'
+            f'<strong>← {escape(prev_post.title)}</strong>'
             f'</a>'
         )
     if next_post:
         nav_links.append(
-            f'<a href="{BASE_PATH}{next_post["url"]}" class="next-post">'
+            f'<a href="{BASE_PATH}{next_post.url}" class="next-post">'
             f'<span>Older post</span>'
-            f'<strong>{escape(next_post["title"])} →</strong>'
+            f'<strong>{escape(next_post.title)} →</strong>'
             f'</a>'
         )
     post_nav = f'<nav class="post-nav">{"".join(nav_links)}</nav>' if nav_links else ""
 
     # Generate tags HTML
     tags_html = ""
-    if post.get('tags'):
-        tag_links = [f'<a href="{BASE_PATH}/tags/{tag}/" class="tag">{escape(tag)}</a>' for tag in post['tags']]
-        label = "Tag" if len(post['tags']) == 1 else "Tags"
+    if post.tags:
+        tag_links = [f'<a href="{BASE_PATH}/tags/{tag}/" class="tag">{escape(tag)}</a>' for tag in post.tags]
+        label = "Tag" if len(post.tags) == 1 else "Tags"
         tags_html = f'<div class="post-tags"><span class="tags-label">{label}:</span> ' + ' '.join(tag_links) + '</div>'
 
     # Render post content
     post_html = render_template(
         post_template,
-        title=escape(post['title']),
-        date=post['date_formatted'],
-        author=post['author'],
+        title=escape(post.title),
+        date=post.date_formatted,
+        author=post.author,
         tags=tags_html,
         content=html_content,
         post_nav=post_nav,
@@ -345,60 +1105,81 @@ def generate_post_page(post, prev_post=None, next_post=None):
     # Render full page
     page_html = render_template(
         base_template,
-        title=f"{post['title']} - {SITE_TITLE}",
+        title=f"{post.title} - {SITE_TITLE}",
         site_title=SITE_TITLE,
         site_byline=SITE_BYLINE,
         base_path=BASE_PATH,
         content=post_html,
         nav_home="",
         nav_projects="",
-        nav_guides=""
+        nav_archive="",
+        nav_search=""
     )
 
     return page_html
 
 
-def generate_home_page(posts, page_num, total_pages):
-    """Generate a home page with post listing."""
-    base_template = load_template('base')
-    home_template = load_template('home')
-
-    # Generate post list HTML
-    post_list_html = ""
-    for post in posts:
-        html_content = render_markdown(post['body'], post['url'])
-        excerpt = rebase_excerpt_urls(get_excerpt(html_content), post['url'])
-        post_url = f"{BASE_PATH}{post['url']}"
-        post_list_html += f'''
+def post_preview(post, cache):
+    """HTML of a post in a listing: title, date and excerpt."""
+    excerpt = rebase_excerpt_urls(cache.excerpt(post), post.url)
+    post_url = f"{BASE_PATH}{post.url}"
+    return f'''
         <article class="post-preview">
-            <h2><a href="{post_url}">{escape(post['title'])}</a></h2>
-            <div class="post-meta">{post['date_formatted']}</div>
+            <h2><a href="{post_url}">{escape(post.title)}</a></h2>
+            <div class="post-meta">{post.date_formatted}</div>
             <div class="post-excerpt">{excerpt}</div>
             <a href="{post_url}" class="read-more">Read more →</a>
         </article>
         '''
 
-    # Generate pagination HTML
-    pagination_html = '<nav class="pagination">'
+
+def paginate(items, per_page):
+    """Split items into pages of per_page items.
+
+    Yields (page number, page count, items on the page), numbered from 1.
+    There is always at least one page, possibly empty.
+    """
+    total_pages = max(1, (len(items) + per_page - 1) // per_page)
+    for page_num in range(1, total_pages + 1):
+        yield page_num, total_pages, items[(page_num - 1) * per_page:page_num * per_page]
+
+
+def page_dir(base, page_num):
+    """Output directory of a listing page: base for page 1, else base/page/N/."""
+    return base if page_num == 1 else f"{base}page/{page_num}/"
+
+
+def pagination_nav(base, page_num, total_pages):
+    """Newer/older links between the pages of a listing below base."""
+    pagination = ['<nav class="pagination">']
     if page_num > 1:
-        prev_url = f"{BASE_PATH}/" if page_num == 2 else f"{BASE_PATH}/page/{page_num - 1}/"
-        pagination_html += f'<a href="{prev_url}" class="prev">← Newer</a>'
+        pagination.append(f'<a href="{BASE_PATH}/{page_dir(base, page_num - 1)}" class="prev">← Newer</a>')
     else:
-        pagination_html += '<span class="prev disabled">← Newer</span>'
+        pagination.append('<span class="prev disabled">← Newer</span>')
 
-    pagination_html += f'<span class="page-info">Page {page_num} of {total_pages}</span>'
+    pagination.append(f'<span class="page-info">Page {page_num} of {total_pages}</span>')
 
     if page_num < total_pages:
-        pagination_html += f'<a href="{BASE_PATH}/page/{page_num + 1}/" class="next">Older →</a>'
+        pagination.append(f'<a href="{BASE_PATH}/{page_dir(base, page_num + 1)}" class="next">Older →</a>')
     else:
-        pagination_html += '<span class="next disabled">Older →</span>'
-    pagination_html += '</nav>'
+        pagination.append('<span class="next disabled">Older →</span>')
+    pagination.append('</nav>')
+    return ''.join(pagination)
+
+
+def generate_home_page(posts, page_num, total_pages, cache):
+    """Generate a home page with post listing."""
+    base_template = load_template('base')
+    home_template = load_template('home')
+
+    # Generate post list HTML
+    post_list_html = ''.join(cache.preview(post) for post in posts)
 
     # Render home content
     home_html = render_template(
         home_template,
         post_list=post_list_html,
-        pagination=pagination_html
+        pagination=pagination_nav('', page_num, total_pages)
     )
 
     # Render full page
@@ -411,7 +1192,8 @@ def generate_home_page(posts, page_num, total_pages):
         content=home_html,
         nav_home='class="active"',
         nav_projects="",
-        nav_guides=""
+        nav_archive="",
+        nav_search=""
     )
 
     return page_html
@@ -428,8 +1210,9 @@ def generate_static_page(title, content_html, active_nav):
         content=content_html
     )
 
-    nav_attrs = {"nav_home": "", "nav_projects": "", "nav_guides": ""}
-    nav_attrs[active_nav] = 'class="active"'
+    nav_attrs = {"nav_home": "", "nav_projects": "", "nav_archive": "", "nav_search": ""}
+    if active_nav:
+        nav_attrs[active_nav] = 'class="active"'
     nav_attrs["base_path"] = BASE_PATH
 
     page_html = render_template(
@@ -444,249 +1227,1877 @@ def generate_static_page(title, content_html, active_nav):
     return page_html
 
 
-def generate_tag_page(tag, posts):
-    """Generate a page listing all posts with a given tag."""
+def generate_listing_page(title, heading_html, base, posts, page_num, total_pages, cache, page_class,
+                          nav_archive=""):
+    """Generate one page of a paginated post listing below base."""
     base_template = load_template('base')
 
     # Generate post list HTML
-    post_list_html = ""
-    for post in posts:
-        html_content = render_markdown(post['body'], post['url'])
-        excerpt = rebase_excerpt_urls(get_excerpt(html_content), post['url'])
-        post_url = f"{BASE_PATH}{post['url']}"
-        post_list_html += f'''
-        <article class="post-preview">
-            <h2><a href="{post_url}">{escape(post['title'])}</a></h2>
-            <div class="post-meta">{post['date_formatted']}</div>
-            <div class="post-excerpt">{excerpt}</div>
-            <a href="{post_url}" class="read-more">Read more →</a>
-        </article>
-        '''
+    post_list_html = ''.join(cache.preview(post) for post in posts)
+    pagination_html = pagination_nav(base, page_num, total_pages) if total_pages > 1 else ''
 
     content_html = f'''
-    <div class="tag-page">
-        <h1>Posts tagged "{escape(tag)}"</h1>
-        <p class="tag-count">{len(posts)} post{"s" if len(posts) != 1 else ""}</p>
+    <div class="{page_class}">
+        {heading_html}
         {post_list_html}
+        {pagination_html}
     </div>
     '''
 
     page_html = render_template(
         base_template,
-        title=f"Tag: {tag} - {SITE_TITLE}",
+        title=f"{title} - {SITE_TITLE}" if page_num == 1 else f"{title}, page {page_num} - {SITE_TITLE}",
         site_title=SITE_TITLE,
         site_byline=SITE_BYLINE,
         base_path=BASE_PATH,
         content=content_html,
         nav_home="",
         nav_projects="",
-        nav_guides=""
+        nav_archive=nav_archive,
+        nav_search=""
     )
 
     return page_html
 
 
-def copy_post_assets(post, output_dir):
-    """Copy images and other assets from post directory."""
+def generate_tag_page(tag, posts, page_num, total_pages, count, cache):
+    """Generate one page of the posts with a given tag."""
+    heading_html = f'''<h1>Posts tagged "{escape(tag)}"</h1>
+        <p class="tag-count">{count} post{"s" if count != 1 else ""} · <a href="{BASE_PATH}/tags/{tag}/atom.xml">feed</a></p>'''
+    return generate_listing_page(
+        f"Tag: {tag}", heading_html, f"tags/{tag}/",
+        posts, page_num, total_pages, cache, 'tag-page',
+    )
+
+
+def generate_archive_page(year, posts, page_num, total_pages, count, years, cache):
+    """Generate one page of the posts published in a given year."""
+    year_links = ' · '.join(
+        str(y) if y == year else f'<a href="{BASE_PATH}/archive/{y}/">{y}</a>' for y in years
+    )
+    heading_html = f'''<h1>Posts from {year}</h1>
+        <p class="tag-count">{count} post{"s" if count != 1 else ""} · {year_links}</p>'''
+    return generate_listing_page(
+        f"Archive: {year}", heading_html, f"archive/{year}/",
+        posts, page_num, total_pages, cache, 'tag-page archive-page', 'class="active"',
+    )
+
+
+def generate_archive_index(years):
+    """Generate the archive entry page listing every year with its post count."""
+    year_items = ''.join(
+        f'<li><a href="{BASE_PATH}/archive/{year}/">{year}</a> · '
+        f'{len(posts)} post{"s" if len(posts) != 1 else ""}</li>'
+        for year, posts in years.items()
+    )
+    return generate_static_page("Archive", f"<ul>{year_items}</ul>", "nav_archive")
+
+
+def collect_years(posts):
+    """Published posts by year, newest year first."""
+    years = {}
+    for post in posts:
+        years.setdefault(post.date_obj.year, []).append(post)
+    return dict(sorted(years.items(), reverse=True))
+
+
+RESPONSIVE_IMAGE_TYPES = {'.png', '.jpg', '.jpeg', '.webp'}
+
+
+def post_asset_files(post):
+    """Images and other assets in a post directory."""
     # For directory-based posts (with index.md), copy all non-md files
     # For standalone .md posts, only copy files with matching stem (e.g., post.jpg for post.md)
-    is_standalone = post['index_file'].name != 'index.md'
-
-    for file in post['path'].iterdir():
+    is_standalone = post.index_file.name != 'index.md'
+    for file in sorted(post.path.iterdir()):
         if not file.is_file():
             continue
         if file.suffix == '.md':
             continue
         # For standalone posts, only copy assets with matching stem
-        if is_standalone and not file.stem.startswith(post['slug']):
+        if is_standalone and not file.stem.startswith(post.slug):
             continue
-        shutil.copy2(file, output_dir / file.name)
+        yield file
+
+
+def post_images(post):
+    """File name -> path of the post assets that get resized variants."""
+    if Image is None:
+        return {}
+    return {file.name: file for file in post_asset_files(post)
+            if file.suffix.lower() in RESPONSIVE_IMAGE_TYPES}
+
+
+def copy_post_assets(post, assets, variants):
+    """Copy images and other assets from post directory.
 
+    Resized variants of its images are added to variants.
+    """
+    output_dir = post.url.strip('/')
+    for file in post_asset_files(post):
+        assets.copy(file, f"{output_dir}/{file.name}")
+        if Image is not None and file.suffix.lower() in RESPONSIVE_IMAGE_TYPES:
+            variants.add(file, f"{output_dir}/{file.name}")
+
+
+def image_size(path):
+    """Pixel (width, height) of an image, or None if it can't be read."""
+    stat = path.stat()
+    return _image_size(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _image_size(path, mtime_ns, size):
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except OSError:
+        return None
+
+
+def variant_widths(width):
+    """Widths of the variants of an image; the original serves its own width."""
+    return [w for w in IMAGE_WIDTHS if w < width]
+
+
+def variant_name(name, width):
+    """File name or URL of a variant, e.g. boot.png -> boot.png.480w.webp."""
+    return f"{name}.{width}w.webp"
+
+
+def encode_variant(src, width, path):
+    """Write src resized to width as WebP to path."""
+    with Image.open(src) as image:
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.LANCZOS)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    image.save(tmp_path, 'WEBP', quality=IMAGE_QUALITY)
+    os.replace(tmp_path, path)
 
-def generate_rss(posts, max_items=20):
-    """Generate RSS feed XML."""
-    items = []
-    for post in posts[:max_items]:
-        pub_date = post['date_obj'].strftime('%a, %d %b %Y 00:00:00 GMT')
-        post_url = f"{SITE_URL}{BASE_PATH}{post['url']}"
 
-        # Get excerpt
-        html_content = render_markdown(post['body'])
-        excerpt = get_excerpt(html_content, 500)
+class ImageVariants:
+    """Resized WebP variants of post images, cached by source content.
 
-        items.append(f'''    <item>
-      <title>{escape(post['title'])}</title>
+    Each variant is encoded once per source hash, width and quality into
+    CACHE_DIR/images and then placed in the output by the AssetCopier like
+    any other asset, so unchanged images are never decoded again.
+    """
+
+    def __init__(self, assets):
+        self.assets = assets
+        self.cache_dir = CACHE_DIR / 'images'
+        self.planned = []  # (src, width, cache path, output path)
+        self.encoded = 0
+
+    def add(self, src, rel_path):
+        size = image_size(src)
+        if size is None:
+            return
+        digest = source_hash(src)
+        for width in variant_widths(size[0]):
+            cache_path = self.cache_dir / f"{hash_text(digest, width, IMAGE_QUALITY)}.webp"
+            self.planned.append((src, width, cache_path, variant_name(rel_path, width)))
+
+    @PROFILER.timed('image variants')
+    def build(self, mapper=map):
+        """Encode missing variants, copy all to the output and prune the cache."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        missing = {}
+        for src, width, cache_path, _ in self.planned:
+            if not cache_path.exists():
+                missing[cache_path] = (src, width)
+        for _ in mapper(encode_variant, [src for src, _ in missing.values()],
+                        [width for _, width in missing.values()], list(missing)):
+            pass
+        self.encoded = len(missing)
+
+        for _, _, cache_path, rel_path in self.planned:
+            self.assets.copy(cache_path, rel_path)
+
+        current = {cache_path.name for _, _, cache_path, _ in self.planned}
+        for path in self.cache_dir.iterdir():
+            if path.name not in current:
+                path.unlink()
+
+    def summary(self):
+        return f"{len(self.planned)} variants, {self.encoded} encoded"
+
+
+def source_hash(path):
+    """Content hash of a source file, computed once per modification."""
+    stat = path.stat()
+    return _source_hash(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _source_hash(path, mtime_ns, size):
+    return file_hash(path)
+
+
+def feed_content(post, html_content):
+    """Prepare post HTML for feed readers, which need absolute URLs."""
+    html_content = ASSET_URLS.rewrite(html_content, f"{post.url.strip('/')}/index.html")
+    base_url = f"{SITE_URL}{BASE_PATH}{post.url}"
+    return rewrite_url_attrs(html_content, lambda url: urljoin(base_url, url))
+
+
+def rfc822_date(value):
+    return value.strftime('%a, %d %b %Y 00:00:00 GMT')
+
+
+def rfc3339_date(value):
+    return value.strftime('%Y-%m-%dT00:00:00Z')
+
+
+def rss_item(post, content):
+    post_url = f"{SITE_URL}{BASE_PATH}{post.url}"
+    return f'''    <item>
+      <title>{escape(post.title)}</title>
       <link>{post_url}</link>
       <guid>{post_url}</guid>
-      <pubDate>{pub_date}</pubDate>
-      <description>{escape(excerpt)}</description>
-    </item>''')
-
+      <pubDate>{rfc822_date(post.date_obj)}</pubDate>
+      <description>{escape(content)}</description>
+    </item>'''
+
+
+def atom_entry(post, content):
+    post_url = f"{SITE_URL}{BASE_PATH}{post.url}"
+    element = 'content' if FEED_FULL_CONTENT else 'summary'
+    categories = ''.join(f'\n    <category term="{escape(tag)}"/>' for tag in post.tags)
+    return f'''  <entry>
+    <title>{escape(post.title)}</title>
+    <link href="{post_url}"/>
+    <id>{post_url}</id>
+    <published>{rfc3339_date(post.date_obj)}</published>
+    <updated>{rfc3339_date(post.updated)}</updated>
+    <author><name>{escape(post.author)}</name></author>{categories}
+    <{element} type="html">{escape(content)}</{element}>
+  </entry>'''
+
+
+def json_feed_item(post, content):
+    post_url = f"{SITE_URL}{BASE_PATH}{post.url}"
+    return {
+        'id': post_url,
+        'url': post_url,
+        'title': post.title,
+        'content_html': content,
+        'date_published': rfc3339_date(post.date_obj),
+        'date_modified': rfc3339_date(post.updated),
+        'authors': [{'name': post.author}],
+        'tags': post.tags,
+    }
+
+
+# Format -> function building the feed entry of a post from its content
+FEED_ENTRIES = {'rss': rss_item, 'atom': atom_entry, 'json': json_feed_item}
+
+
+def feed_updated(posts):
+    """Last change among the posts of a feed.
+
+    Derived from post dates rather than the build time, so a feed's bytes
+    only change when its posts do, and polling readers get 304s.
+    """
+    return max((post.updated for post in posts), default=datetime(1970, 1, 1))
+
+
+@PROFILER.timed('feeds')
+def generate_rss(posts, cache, title, page_path):
+    """Generate RSS feed XML."""
+    page_url = f"{SITE_URL}{BASE_PATH}/{page_path}"
+    items = [cache.feed_entry(post, 'rss') for post in posts]
     rss = f'''<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
   <channel>
-    <title>{escape(SITE_TITLE)}</title>
-    <link>{SITE_URL}{BASE_PATH}/</link>
+    <title>{escape(title)}</title>
+    <link>{page_url}</link>
     <description>{escape(SITE_BYLINE)}</description>
     <language>en-us</language>
-    <lastBuildDate>{datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')}</lastBuildDate>
-    <atom:link href="{SITE_URL}{BASE_PATH}/feed.xml" rel="self" type="application/rss+xml"/>
+    <lastBuildDate>{rfc822_date(feed_updated(posts))}</lastBuildDate>
+    <atom:link href="{page_url}feed.xml" rel="self" type="application/rss+xml"/>
 {chr(10).join(items)}
   </channel>
 </rss>'''
     return rss
 
 
-def build_site():
-    """Build the complete static site."""
+@PROFILER.timed('feeds')
+def generate_atom(posts, cache, title, page_path):
+    """Generate Atom feed XML."""
+    page_url = f"{SITE_URL}{BASE_PATH}/{page_path}"
+    entries = [cache.feed_entry(post, 'atom') for post in posts]
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>{escape(title)}</title>
+  <subtitle>{escape(SITE_BYLINE)}</subtitle>
+  <link href="{page_url}"/>
+  <link href="{page_url}atom.xml" rel="self" type="application/atom+xml"/>
+  <id>{page_url}</id>
+  <updated>{rfc3339_date(feed_updated(posts))}</updated>
+{chr(10).join(entries)}
+</feed>'''
+
+
+@PROFILER.timed('feeds')
+def generate_json_feed(posts, cache, title, page_path):
+    """Generate a JSON Feed (https://jsonfeed.org/version/1.1)."""
+    page_url = f"{SITE_URL}{BASE_PATH}/{page_path}"
+    items = [cache.feed_entry(post, 'json') for post in posts]
+    return json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': title,
+        'description': SITE_BYLINE,
+        'home_page_url': page_url,
+        'feed_url': f"{page_url}feed.json",
+        'language': 'en-US',
+        'items': items,
+    }, ensure_ascii=False, indent=2)
+
+
+# Feeds published for the site and for each tag, next to its listing page
+FEED_FORMATS = (('feed.xml', generate_rss), ('atom.xml', generate_atom), ('feed.json', generate_json_feed))
+
+
+SEARCH_INDEX_VERSION = 2  # Bump when tokenizing or weighting changes
+SEARCH_TOKEN = re.compile(r'[a-z0-9]+')
+SEARCH_STOPWORDS = frozenset(
+    "about after all also an and any are as at be because been but by can could "
+    "do does for from had has have how if in into is it its just more most no not "
+    "of on one only or other our out so some such than that the their them then "
+    "there these they this to too two up us very was we were what when which while "
+    "who will with would you your".split()
+)
+SEARCH_NON_TEXT = re.compile(r'<(script|style)\b.*?</\1>', flags=re.DOTALL | re.IGNORECASE)
+# Inline spans, e.g. from syntax highlighting, can split a word in several
+SEARCH_INLINE_TAG = re.compile(r'</?span\b[^>]*>', flags=re.IGNORECASE)
+
+
+def search_tokens(text):
+    """Split text into index terms, matching the tokenizer in search.html."""
+    return [
+        token for token in SEARCH_TOKEN.findall(text.lower())
+        if len(token) >= 2 and token not in SEARCH_STOPWORDS
+    ]
+
+
+def post_search_terms(post, html_content):
+    """Weighted index terms of a post: title and tag matches rank above body text."""
+    text = SEARCH_INLINE_TAG.sub('', SEARCH_NON_TEXT.sub(' ', html_content))
+    text = unescape(HTML_TAG.sub(' ', text))
+    weights = {}
+    for token in search_tokens(text):
+        weights[token] = weights.get(token, 0) + 1
+    # Cap body frequency so long posts do not drown out short ones
+    weights = {token: min(count, 10) for token, count in weights.items()}
+    for tag in post.tags:
+        for token in search_tokens(tag):
+            weights[token] = weights.get(token, 0) + 20
+    for token in search_tokens(post.title):
+        weights[token] = weights.get(token, 0) + 30
+    return weights
+
+
+def search_terms_path(post):
+    return CACHE_DIR / 'search-terms' / f"{hash_text(post.fingerprint, SEARCH_INDEX_VERSION)}.json"
+
+
+def save_search_terms(post, terms):
+    """Store the index terms of a post in the on-disk term cache."""
+    path = search_terms_path(post)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(terms, f, separators=(',', ':'))
+
+
+def load_search_terms(posts, cache, mapper):
+    """Yield the index terms of each post from the on-disk term cache.
+
+    Terms are cached per post fingerprint and saved whenever a post is
+    summarized, so an incremental build only renders and tokenizes the
+    posts that changed. They are read one post at a time and never all
+    held in memory.
+    """
+    terms_dir = CACHE_DIR / 'search-terms'
+    terms_dir.mkdir(parents=True, exist_ok=True)
+    paths = [search_terms_path(post) for post in posts]
+    cache.prefetch([post for post, path in zip(posts, paths) if not path.exists()], mapper)
+    for post, path in zip(posts, paths):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                terms = json.load(f)
+        except (OSError, ValueError):
+            # Summarized earlier but lost from disk since, e.g. in the dev server
+            terms = post_search_terms(post, render_post_body(post))
+            save_search_terms(post, terms)
+        yield terms
+
+    # Drop cached terms of posts that changed or no longer exist
+    current = {path.name for path in paths}
+    for path in terms_dir.iterdir():
+        if path.name not in current:
+            path.unlink()
+
+
+def generate_search_index(posts, terms):
+    """Generate the search index files as (path below search/index/, text).
+
+    Postings are sharded by the first two characters of the term, and post
+    metadata into chunks of SEARCH_DOCS_PER_SHARD, so a query only downloads
+    the shards for its terms and the metadata of its results.
+
+    Posts come newest first but are numbered oldest first, so a new post
+    takes the next free ID and only the files holding its terms change.
+    """
+    shards = {}
+    for position, weights in enumerate(terms):
+        doc_id = len(posts) - 1 - position
+        for token, weight in weights.items():
+            shards.setdefault(token[:2], {}).setdefault(token, []).append((doc_id, weight))
+
+    for prefix, index in shards.items():
+        for postings in index.values():
+            postings.sort(key=lambda posting: (-posting[1], -posting[0]))
+        yield f"shards/{prefix}.json", json.dumps(index, sort_keys=True, separators=(',', ':'))
+
+    docs = [
+        {'url': f"{BASE_PATH}{post.url}", 'title': post.title, 'date': post.date_formatted}
+        for post in reversed(posts)
+    ]
+    for start in range(0, len(docs), SEARCH_DOCS_PER_SHARD):
+        yield f"docs/{start // SEARCH_DOCS_PER_SHARD}.json", json.dumps(
+            docs[start:start + SEARCH_DOCS_PER_SHARD], ensure_ascii=False, separators=(',', ':'))
+
+
+def generate_search_page():
+    """Generate the search page."""
+    content_html = render_template(
+        load_template('search'),
+        base_path=BASE_PATH,
+        docs_per_shard=SEARCH_DOCS_PER_SHARD,
+        stopwords=json.dumps(sorted(SEARCH_STOPWORDS)),
+    )
+    return render_template(
+        load_template('base'),
+        title=f"Search - {SITE_TITLE}",
+        site_title=SITE_TITLE,
+        site_byline=SITE_BYLINE,
+        base_path=BASE_PATH,
+        content=content_html,
+        nav_home="",
+        nav_projects="",
+        nav_archive="",
+        nav_search='class="active"'
+    )
+
+
+def hash_text(*parts):
+    """Return a hex digest identifying the given strings."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    """Return a hex digest of a file's contents."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def config_fingerprint():
+    """Hash of the configuration and generator code that affect every page."""
+    config = (
+        SITE_TITLE, SITE_BYLINE, SITE_URL, POSTS_PER_PAGE, BASE_PATH, STRICT_TEMPLATES,
+        FEED_ITEMS, FEED_FULL_CONTENT,
+        GISCUS_REPO, GISCUS_REPO_ID, GISCUS_CATEGORY, GISCUS_CATEGORY_ID,
+        HIGHLIGHT_STYLE, pygments.__version__ if pygments else None,
+        IMAGE_WIDTHS, IMAGE_QUALITY, CONTENT_WIDTH, PIL.__version__ if PIL else None,
+    )
+    return hash_text(repr(config), file_hash(__file__))
+
+
+def template_fingerprint(*names):
+    """Hash of the given templates."""
+    return hash_text(*(file_hash(TEMPLATES_DIR / f"{name}.html") for name in names))
+
+
+def post_fingerprint(post):
+    """Hash of everything a post contributes to the pages that show it."""
+    return hash_text(
+        post.url, post.title, post.date_obj.strftime('%Y-%m-%d'),
+        post.updated.strftime('%Y-%m-%d'), post.date_formatted, post.draft, post.author,
+        '\0'.join(post.tags), INCLUDES.body_hash(post),
+        # Rendered <img> tags carry the size of the image
+        *(f"{name}:{image_size(path)}" for name, path in post_images(post).items()),
+    )
+
+
+class BuildManifest:
+    """Persistent record of build outputs and the inputs they were built from.
+
+    Each output path maps to a fingerprint of its inputs. An incremental build
+    skips outputs whose fingerprint is unchanged, and deletes outputs that the
+    previous build produced but the current one no longer does.
+    """
+
+    VERSION = 1
+
+    def __init__(self, previous=None, prune=False):
+        self.previous = previous or {}
+        self.prune = prune
+        self.outputs = {}
+        self.built = 0
+        self.skipped = 0
+
+    @classmethod
+    def load(cls):
+        """Load the manifest of the previous build, or None if unusable."""
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != cls.VERSION or data.get('output_dir') != str(OUTPUT_DIR):
+            return None
+        return cls(data['outputs'])
+
+    def save(self):
+        MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': self.VERSION, 'output_dir': str(OUTPUT_DIR), 'outputs': self.outputs}
+        with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+
+    def is_fresh(self, rel_path, fingerprint):
+        """Whether an output was built from the same inputs and still exists."""
+        return self.previous.get(rel_path) == fingerprint and (OUTPUT_DIR / rel_path).exists()
+
+    def keep_group(self, prefix, fingerprint):
+        """Like keep(), for all outputs below prefix that were built together."""
+        paths = [path for path in self.previous if path.startswith(prefix)]
+        if not paths or not all(self.is_fresh(path, fingerprint) for path in paths):
+            return False
+        for path in paths:
+            self.record(path, fingerprint, built=False)
+        return True
+
+    def keep(self, rel_path, fingerprint):
+        """Record an output as up to date if it is fresh. Returns True if kept."""
+        if not self.is_fresh(rel_path, fingerprint):
+            return False
+        self.record(rel_path, fingerprint, built=False)
+        return True
+
+    def record(self, rel_path, fingerprint, built):
+        self.outputs[rel_path] = fingerprint
+        if built:
+            self.built += 1
+        else:
+            self.skipped += 1
+
+    def remove_orphans(self, sidecars=()):
+        """Delete outputs of the previous build that are no longer produced.
+
+        With prune set, as for a full build without a previous manifest, every
+        file in OUTPUT_DIR that this build did not produce is deleted, except
+        sidecars (compressed copies with one of the given suffixes) of outputs
+        that are still produced.
+        """
+        orphans = set(self.previous) - set(self.outputs)
+        if self.prune:
+            for path in OUTPUT_DIR.rglob('*'):
+                rel_path = path.relative_to(OUTPUT_DIR).as_posix()
+                if path.is_dir() or rel_path in self.outputs:
+                    continue
+                base, suffix = os.path.splitext(rel_path)
+                if suffix in sidecars and base in self.outputs:
+                    continue
+                orphans.add(rel_path)
+        removed = sorted(orphans)
+        for rel_path in removed:
+            path = OUTPUT_DIR / rel_path
+            if path.is_file():
+                path.unlink()
+                CHANGES.record(rel_path, 'removed')
+            # Prune directories left empty
+            parent = path.parent
+            while parent != OUTPUT_DIR and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        return removed
+
+
+class OutputChanges:
+    """Output paths added, changed and removed by a build.
+
+    Saved to CHANGES_FILE with the content hashes of added and changed
+    files, so a deploy only has to upload what a build actually touched.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.changes = {'added': {}, 'changed': {}, 'removed': {}}
+
+    def record(self, rel_path, change, digest=None):
+        with self.lock:
+            self.changes[change][rel_path] = digest
+
+    def save(self):
+        data = {
+            'output_dir': str(OUTPUT_DIR),
+            'added': dict(sorted(self.changes['added'].items())),
+            'changed': dict(sorted(self.changes['changed'].items())),
+            'removed': sorted(self.changes['removed']),
+        }
+        CHANGES_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(CHANGES_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+
+    def summary(self):
+        return ', '.join(f"{len(self.changes[change])} {change}" for change in self.changes)
+
+
+CHANGES = OutputChanges()
+
+
+def replace_file(path, write):
+    """Create path atomically: write(tmp_path) fills a temporary file that then replaces it.
+
+    Readers, such as the dev server or a sync running during a build, never
+    see a partial file, and hardlinked copies of the old file are left alone.
+    """
+    WRITER.make_dirs([path.parent])
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_if_changed(path, data):
+    """Atomically write bytes to path unless it already holds exactly them.
+
+    Returns 'added' or 'changed' if the file was written, None otherwise.
+    """
+    try:
+        existed = True
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return None
+    except FileNotFoundError:
+        existed = False
+
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+
+    replace_file(path, write)
+    return 'changed' if existed else 'added'
+
+
+class OutputWriter:
+    """Writes outputs on background threads, so rendering does not wait for the disk.
+
+    At most WRITE_QUEUE outputs are pending at once; submitting more blocks
+    until one is written, which keeps memory bounded when the disk is slower
+    than rendering. Errors are collected and raised by finish(), at the end
+    of the build, rather than lost in a worker thread.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.dirs = set()
+
+    def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=WRITE_THREADS, thread_name_prefix='writer')
+        self.slots = threading.BoundedSemaphore(WRITE_QUEUE)
+        self.errors = []
+        # Directories may have been deleted since the last build
+        self.dirs = set()
+
+    def make_dirs(self, dirs):
+        """Create directories, each only once per build."""
+        for path in sorted(set(dirs) - self.dirs):
+            path.mkdir(parents=True, exist_ok=True)
+            self.dirs.add(path)
+
+    def prepare(self, rel_paths):
+        """Create the directories of outputs about to be written, up front."""
+        self.make_dirs((OUTPUT_DIR / rel_path).parent for rel_path in rel_paths)
+
+    def submit(self, rel_path, data):
+        if self.executor is None:
+            self._write(rel_path, data)
+            return
+        self.slots.acquire()
+        future = self.executor.submit(self._write, rel_path, data)
+        future.add_done_callback(lambda future, rel_path=rel_path: self._done(rel_path, future))
+
+    def _done(self, rel_path, future):
+        self.slots.release()
+        if future.exception() is not None:
+            self.errors.append((rel_path, future.exception()))
+
+    @PROFILER.timed('file writes')
+    def _write(self, rel_path, data):
+        change = write_if_changed(OUTPUT_DIR / rel_path, data)
+        if change:
+            CHANGES.record(rel_path, change, hashlib.sha256(data).hexdigest())
+
+    def finish(self):
+        """Wait for all pending writes. Raises the first error if any write failed."""
+        if self.executor is None:
+            return
+        self.executor.shutdown()
+        self.executor = None
+        for rel_path, error in self.errors:
+            print(f"  Failed to write /{rel_path}: {error}", file=sys.stderr)
+        if self.errors:
+            raise self.errors[0][1]
+
+
+WRITER = OutputWriter()
+
+
+@PROFILER.timed('output queueing')
+def write_output(rel_path, text):
+    """Write a generated file below OUTPUT_DIR, unless it is unchanged.
+
+    The write itself happens in the background; see OutputWriter.
+    """
+    if rel_path.endswith('.html'):
+        text = ASSET_URLS.rewrite(text, rel_path)
+    WRITER.submit(rel_path, MINIFIER.minify(rel_path, text).encode('utf-8'))
+
+
+def build_output(manifest, rel_path, fingerprint, render):
+    """Render and write an output unless it is up to date.
+
+    Returns True if the output was (re)built.
+    """
+    if manifest.keep(rel_path, fingerprint):
+        return False
+    write_output(rel_path, render())
+    manifest.record(rel_path, fingerprint, built=True)
+    return True
+
+
+def format_size(num_bytes):
+    """Human-readable byte count."""
+    for unit in ('B', 'KB', 'MB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+class AssetCopier:
+    """Copies source assets to OUTPUT_DIR, skipping files already in place.
+
+    A destination is up to date if the manifest says it was built from the
+    same source, if it is the source itself (hardlinked by an earlier build),
+    or if it has the same size and either the same mtime (copy2 preserves it)
+    or the same content hash. With link=True, files are hardlinked instead of
+    copied when source and output are on the same filesystem.
+    """
+
+    def __init__(self, manifest, link=False):
+        self.manifest = manifest
+        self.link = link
+        self.counts = {'copied': 0, 'linked': 0, 'skipped': 0}
+        self.sizes = {'copied': 0, 'linked': 0, 'skipped': 0}
+
+    def copy(self, src, rel_path, keep_name=False):
+        """Copy src to rel_path below OUTPUT_DIR. Returns True if it was written.
+
+        With fingerprinting enabled, the copy goes to a content-hashed name
+        instead, or in addition to rel_path if keep_name is set.
+        """
+        hashed_path = ASSET_URLS.add(rel_path, source_hash(src)) if ASSET_URLS.enabled else None
+        if hashed_path is None:
+            return self._copy(src, rel_path)
+        written = self._copy(src, hashed_path)
+        if keep_name:
+            written = self._copy(src, rel_path) or written
+        return written
+
+    @PROFILER.timed('asset copies')
+    def _copy(self, src, rel_path):
+        stat = src.stat()
+        fingerprint = f"{stat.st_size}-{stat.st_mtime_ns}"
+        dest = OUTPUT_DIR / rel_path
+        if self.manifest.is_fresh(rel_path, fingerprint) or self._up_to_date(src, stat, dest):
+            self.manifest.record(rel_path, fingerprint, built=False)
+            self._count('skipped', stat.st_size)
+            return False
+
+        change = 'changed' if dest.exists() else 'added'
+        if self.link:
+            try:
+                replace_file(dest, lambda tmp_path: os.link(src, tmp_path))
+            except OSError:
+                # Different filesystem or no hardlink support: copy from now on
+                self.link = False
+            else:
+                self._record(src, rel_path, fingerprint, change)
+                self._count('linked', stat.st_size)
+                return True
+        replace_file(dest, lambda tmp_path: shutil.copy2(src, tmp_path))
+        self._record(src, rel_path, fingerprint, change)
+        self._count('copied', stat.st_size)
+        return True
+
+    def _record(self, src, rel_path, fingerprint, change):
+        self.manifest.record(rel_path, fingerprint, built=True)
+        CHANGES.record(rel_path, change, source_hash(src))
+
+    def _up_to_date(self, src, stat, dest):
+        try:
+            dest_stat = dest.stat()
+        except OSError:
+            return False
+        if (dest_stat.st_dev, dest_stat.st_ino) == (stat.st_dev, stat.st_ino):
+            return True
+        if dest_stat.st_size != stat.st_size:
+            return False
+        return dest_stat.st_mtime_ns == stat.st_mtime_ns or file_hash(dest) == file_hash(src)
+
+    def _count(self, kind, size):
+        self.counts[kind] += 1
+        self.sizes[kind] += size
+
+    def summary(self):
+        """Return a one-line summary of the bytes copied, linked and skipped."""
+        return ', '.join(
+            f"{self.counts[kind]} {kind} ({format_size(self.sizes[kind])})"
+            for kind in ('copied', 'linked', 'skipped')
+        )
+
+
+class AssetUrls:
+    """Content-hashed names of assets, for --fingerprint.
+
+    Assets are published as name.<hash>.ext next to where they would
+    otherwise go, and rewrite() points the src, href and srcset references
+    of generated pages at those names. The URL of an asset then changes
+    whenever its content does, so it can be served as immutable.
+    """
+
+    # Pages keep their URLs
+    SKIP_EXTENSIONS = {'.html', '.htm'}
+
+    def __init__(self):
+        self.enabled = False
+        self.digests = {}  # logical output path -> content hash in its name
+
+    def reset(self, enabled):
+        self.enabled = enabled
+        self.digests = {}
+
+    def add(self, rel_path, digest):
+        """Register an asset. Returns its hashed path, or None if it keeps its name."""
+        if os.path.splitext(rel_path)[1].lower() in self.SKIP_EXTENSIONS:
+            return None
+        self.digests[rel_path] = digest[:10]
+        return hashed_name(rel_path, digest[:10])
+
+    def manifest(self):
+        """Logical path -> hashed path of every fingerprinted asset, as JSON."""
+        paths = {rel_path: hashed_name(rel_path, digest) for rel_path, digest in sorted(self.digests.items())}
+        return json.dumps(paths, indent=2) + '\n'
+
+    def digest(self):
+        """Hash of the mapping, which every page that links to an asset depends on."""
+        return hash_text(self.enabled, *sorted(self.digests.items()))
+
+    def rewrite(self, html_content, rel_path):
+        """Point references to fingerprinted assets in a page at their hashed names."""
+        if not self.digests:
+            return html_content
+        page_url = f"{BASE_PATH}/{rel_path}"
+
+        def rewrite(url):
+            if urlparse(url).scheme or url.startswith(("#", "//")):
+                return url
+            path = re.split(r'[?#]', url, maxsplit=1)[0]
+            absolute = unquote(urljoin(page_url, path))
+            if not absolute.startswith(f"{BASE_PATH}/"):
+                return url
+            digest = self.digests.get(absolute[len(BASE_PATH) + 1:])
+            if digest is None:
+                return url
+            # Keep the URL relative or absolute as it was
+            return hashed_name(path, digest) + url[len(path):]
+
+        return rewrite_url_attrs(html_content, rewrite)
+
+
+def hashed_name(path, digest):
+    """Insert a content hash before the extension: css/style.css -> css/style.<digest>.css."""
+    head, slash, name = path.rpartition('/')
+    stem, dot, ext = name.rpartition('.')
+    name = f"{stem}.{digest}.{ext}" if stem else f"{name}.{digest}"
+    return f"{head}{slash}{name}"
+
+
+ASSET_URLS = AssetUrls()
+
+
+MINIFY_VERSION = 1  # Bump when minify_html() or minify_css() change
+# Elements whose content is kept as is, since whitespace in them may matter, then comments and whitespace
+HTML_MINIFY = re.compile(r'(<(pre|code|textarea|script|style)\b.*?</\2\s*>)|<!--.*?-->|\s+',
+                         flags=re.DOTALL | re.IGNORECASE)
+CSS_MINIFY = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')'
+    r'|(?:\s|/\*.*?\*/)*([{};,>])(?:\s|/\*.*?\*/)*|(:)\s+|(?:\s|/\*.*?\*/)+',
+    flags=re.DOTALL,
+)
+
+
+def minify_html(html_content):
+    """Collapse whitespace and drop comments, except in pre, code, textarea, script and style.
+
+    A whitespace run becomes one newline if it holds one, else one space, so
+    the text renders exactly as before.
+    """
+    def minify(match):
+        if match.group(1):
+            return match.group(1)
+        if match.group(0).startswith('<!--'):
+            return ''
+        return '\n' if '\n' in match.group(0) else ' '
+
+    return HTML_MINIFY.sub(minify, html_content).strip() + '\n'
+
+
+def minify_css(css):
+    """Drop comments and the whitespace around punctuation, keeping strings intact.
+
+    Comments and whitespace between words become one space, which is how
+    CSS reads them anyway.
+    """
+    def minify(match):
+        if match.group(1):
+            return match.group(1)
+        if match.group(2):
+            return match.group(2)
+        if match.group(3):
+            return ':'
+        return ' '
+
+    return CSS_MINIFY.sub(minify, css).replace(';}', '}').strip() + '\n'
+
+
+class Minifier:
+    """Minification of generated HTML and CSS, for --minify.
+
+    Results are cached on disk by input hash, so pages that render the same
+    as before, e.g. after a generator change, are not minified again.
+    Copied files such as static/ are left alone: they may be hardlinks to
+    the sources.
+    """
+
+    MINIFIERS = {'.html': minify_html, '.css': minify_css}
+
+    def __init__(self):
+        self.reset(False)
+
+    def reset(self, enabled):
+        self.enabled = enabled
+        self.used = set()
+        self.minified = 0
+        self.cached = 0
+        self.original_size = 0
+        self.minified_size = 0
+
+    def minify(self, rel_path, text):
+        """Return the minified text of an output, or the text if it is not HTML or CSS."""
+        minifier = self.MINIFIERS.get(os.path.splitext(rel_path)[1].lower())
+        if not self.enabled or minifier is None:
+            return text
+        key = hash_text(MINIFY_VERSION, rel_path.endswith('.css'), text)
+        path = CACHE_DIR / 'minify' / key
+        self.used.add(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                minified = f.read()
+            self.cached += 1
+        except OSError:
+            minified = minifier(text)
+            replace_file(path, lambda tmp_path: tmp_path.write_text(minified, encoding='utf-8'))
+            self.minified += 1
+        self.original_size += len(text.encode('utf-8'))
+        self.minified_size += len(minified.encode('utf-8'))
+        return minified
+
+    def prune(self):
+        """Drop cached results that the build did not use. Only valid after a full build."""
+        cache_dir = CACHE_DIR / 'minify'
+        if cache_dir.exists():
+            for path in cache_dir.iterdir():
+                if path.name not in self.used:
+                    path.unlink()
+
+    def summary(self):
+        saved = self.original_size - self.minified_size
+        return (f"{self.minified + self.cached} files ({self.cached} cached), "
+                f"{format_size(self.original_size)} -> {format_size(self.minified_size)}, "
+                f"{format_size(saved)} saved")
+
+
+MINIFIER = Minifier()
+
+
+COMPRESS_EXTENSIONS = {'.html', '.xml', '.css', '.js', '.json', '.svg', '.txt'}
+COMPRESS_STATE_FILE = CACHE_DIR / "compress.json"
+SIDECAR_SUFFIXES = ('.gz', '.br', '.zst')  # Of every encoder, installed or not
+
+
+def compressors():
+    """Sidecar suffix -> compression function, for the available encoders."""
+    encoders = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders['.br'] = lambda data: brotli.compress(data, quality=11)
+    if zstandard is not None:
+        encoders['.zst'] = lambda data: zstandard.ZstdCompressor(level=19).compress(data)
+    return encoders
+
+
+def remove_stale_sidecars():
+    """Delete the compressed sidecars of outputs this build wrote or removed.
+
+    Without --compress nothing refreshes them, and a server that prefers
+    precompressed files would keep serving the old content. Returns the
+    removed paths.
+    """
+    removed = []
+    changes = CHANGES.changes
+    for rel_path in [*changes['added'], *changes['changed'], *changes['removed']]:
+        for suffix in SIDECAR_SUFFIXES:
+            sidecar = OUTPUT_DIR / (rel_path + suffix)
+            if sidecar.is_file():
+                sidecar.unlink()
+                CHANGES.record(rel_path + suffix, 'removed')
+                removed.append(rel_path + suffix)
+    return removed
+
+
+def compress_file(path, previous, encoders):
+    """Write compressed sidecars for path unless its content is unchanged.
+
+    previous is the (content hash, sidecar suffixes) recorded for the file
+    by the last run. Returns the new record, the original size and the size
+    of the smallest sidecar, or None for the size if the file was skipped.
+    """
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if previous and previous[0] == digest and all(
+            path.with_name(path.name + suffix).exists() for suffix in previous[1]):
+        return previous, len(data), None
+
+    written = []
+    smallest = len(data)
+    for suffix, compress in encoders.items():
+        sidecar = path.with_name(path.name + suffix)
+        rel_path = sidecar.relative_to(OUTPUT_DIR).as_posix()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            # Not worth serving; the server falls back to the original
+            if sidecar.exists():
+                sidecar.unlink()
+                CHANGES.record(rel_path, 'removed')
+            continue
+        change = write_if_changed(sidecar, compressed)
+        if change:
+            CHANGES.record(rel_path, change, hashlib.sha256(compressed).hexdigest())
+        written.append(suffix)
+        smallest = min(smallest, len(compressed))
+    return [digest, written], len(data), smallest
+
+
+@PROFILER.timed('compression')
+def compress_outputs(jobs=1):
+    """Write .gz (and .br/.zst where available) sidecars for text outputs.
+
+    Files are compressed in parallel at maximum compression. Content hashes
+    from the previous run are kept in the build cache, so only files whose
+    bytes changed are recompressed; sidecars of removed files are deleted.
+    """
+    encoders = compressors()
+    try:
+        with open(COMPRESS_STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    if state.get('output_dir') != str(OUTPUT_DIR) or state.get('encodings') != list(encoders):
+        state = {}
+    records = state.get('files', {})
+
+    sources = []
+    for path in OUTPUT_DIR.rglob('*'):
+        if path.suffix in encoders:
+            source = path.with_suffix('')
+            if source.suffix in COMPRESS_EXTENSIONS and not source.exists():
+                path.unlink()
+                CHANGES.record(path.relative_to(OUTPUT_DIR).as_posix(), 'removed')
+        elif path.suffix in COMPRESS_EXTENSIONS and path.is_file():
+            sources.append(path)
+
+    new_records = {}
+    compressed = unchanged = original_size = compressed_size = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        rel_paths = [path.relative_to(OUTPUT_DIR).as_posix() for path in sources]
+        results = executor.map(
+            compress_file, sources, [records.get(rel) for rel in rel_paths],
+            [encoders] * len(sources),
+        )
+        for rel_path, (record, size, smallest) in zip(rel_paths, results):
+            new_records[rel_path] = record
+            if smallest is None:
+                unchanged += 1
+            else:
+                compressed += 1
+                original_size += size
+                compressed_size += smallest
+
+    COMPRESS_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(COMPRESS_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'output_dir': str(OUTPUT_DIR), 'encodings': list(encoders), 'files': new_records}, f)
+    print(
+        f"Compressed ({', '.join(encoders)}): {compressed} files, "
+        f"{format_size(original_size)} -> {format_size(compressed_size)}, {unchanged} unchanged"
+    )
+
+
+ANCHOR_ATTR = re.compile(r'\s(?:id|name)="([^"]+)"')
+
+
+def scan_page(path):
+    """Anchor ids and links of a generated page. Runs in worker processes.
+
+    Returns the ids and a list of (line, URL). Scripts and styles are
+    skipped, as they hold URL templates rather than links.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        html_content = f.read()
+    # Blank out scripts and styles but keep their newlines, for line numbers
+    html_content = SEARCH_NON_TEXT.sub(lambda match: '\n' * match.group(0).count('\n'), html_content)
+    ids = set(ANCHOR_ATTR.findall(html_content))
+    links = []
+    line = 1
+    pos = 0
+    for match in URL_ATTR.finditer(html_content):
+        line += html_content.count('\n', pos, match.start())
+        pos = match.start()
+        attr, value = match.groups()
+        if attr == 'srcset':
+            urls = [candidate.strip().split(' ', 1)[0] for candidate in value.split(',')]
+        else:
+            urls = [value]
+        links.extend((line, unescape(url)) for url in urls)
+    return ids, links
+
+
+def check_link(url, rel_path, files, anchors):
+    """Return what is wrong with a link on the page at rel_path, or None."""
+    parsed = urlparse(url)
+    if parsed.scheme or parsed.netloc:
+        return None  # external, checked by nobody offline
+    page_url = f"{BASE_PATH}/{rel_path}"
+    target = unquote(urljoin(page_url, parsed.path)) if parsed.path else page_url
+    if not target.startswith(f"{BASE_PATH}/"):
+        return "outside the site"
+    target = target[len(BASE_PATH) + 1:]
+    if target == '' or target.endswith('/'):
+        target += 'index.html'
+    elif target not in files:
+        # GitHub Pages also serves dir/index.html for dir and page.html for page
+        target = next((t for t in (f"{target}/index.html", f"{target}.html") if t in files), target)
+    if target not in files:
+        return "missing"
+    fragment = unquote(parsed.fragment)
+    if fragment and fragment != 'top' and target in anchors and fragment not in anchors[target]:
+        return "missing anchor"
+    return None
+
+
+def output_sources():
+    """Markdown source of each generated page, by output path."""
+    sources = {f"{post.url.strip('/')}/index.html": post.index_file for post in collect_posts()}
+    for page in collect_pages():
+        sources[f"{page['url'].strip('/')}/index.html"] = page['file']
+    return sources
+
+
+def source_line(source, url):
+    """Line number of the first line of a markdown file that mentions url, or None."""
+    with open(source, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    path = re.split(r'[?#]', url, maxsplit=1)[0]
+    if BASE_PATH and path.startswith(f"{BASE_PATH}/"):
+        path = path[len(BASE_PATH):]
+    patterns = [re.compile(rf'(?<![\w./-]){re.escape(candidate)}(?![\w/-])')
+                for candidate in (url, path, unquote(path)) if candidate]
+    # Rendering may have rebased or prefixed the URL, so fall back to its file name
+    name = unquote(path).rstrip('/').rsplit('/', 1)[-1]
+    if name:
+        patterns.append(re.compile(re.escape(name)))
+    for pattern in patterns:
+        for number, text in enumerate(lines, 1):
+            if pattern.search(text):
+                return number
+    return None
+
+
+@PROFILER.timed('link check')
+def check_site(jobs=1):
+    """Check the internal links, asset references and #fragments of OUTPUT_DIR.
+
+    One pass over the output indexes every file and scans every page for
+    its anchor ids and links, in jobs processes; links are then checked
+    against that index without touching the network. Each problem is
+    reported with the page and line it occurs on, and the line of the
+    markdown source it most likely comes from. Returns the number found.
+    """
+    start = time.perf_counter()
+    files = set()
+    for dirpath, _, filenames in os.walk(OUTPUT_DIR):
+        rel_dir = Path(dirpath).relative_to(OUTPUT_DIR).as_posix()
+        files.update(name if rel_dir == '.' else f"{rel_dir}/{name}" for name in filenames)
+    pages = sorted(rel_path for rel_path in files if rel_path.endswith(('.html', '.htm')))
+
+    paths = [OUTPUT_DIR / rel_path for rel_path in pages]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            scans = list(executor.map(scan_page, paths, chunksize=16))
+    else:
+        scans = list(map(scan_page, paths))
+    anchors = {rel_path: ids for rel_path, (ids, _) in zip(pages, scans)}
+
+    sources = output_sources()
+    problems = 0
+    checked = 0
+    for rel_path, (_, links) in zip(pages, scans):
+        for line, url in links:
+            checked += 1
+            problem = check_link(url, rel_path, files, anchors)
+            if problem is None:
+                continue
+            problems += 1
+            report = f"  {rel_path}:{line}: {problem}: {url}"
+            source = sources.get(rel_path)
+            if source is not None:
+                number = source_line(source, url)
+                where = source.relative_to(ROOT_DIR) if source.is_relative_to(ROOT_DIR) else source
+                report += f" ({where}{f':{number}' if number else ''})"
+            print(report)
+
+    print(
+        f"Checked {checked} links in {len(pages)} pages in "
+        f"{time.perf_counter() - start:.2f} s: {problems} broken"
+    )
+    return problems
+
+
+def render_post_task(post, prev_post, next_post):
+    """Render a post page.
+
+    Returns the page, the rendered post body and the render time. Runs in
+    worker processes when building with several jobs.
+    """
+    start = time.perf_counter()
+    cache = RenderCache()
+    page_html = generate_post_page(post, cache, prev_post, next_post)
+    return page_html, cache.html(post), time.perf_counter() - start
+
+
+def render_page_task(title, body, active_nav):
+    """Render a content page. Runs in worker processes like render_post_task."""
+    start = time.perf_counter()
+    page_html = generate_static_page(title, render_markdown(body), active_nav)
+    return page_html, time.perf_counter() - start
+
+
+def build_site(incremental=False, jobs=1, cache=None, link_assets=False, compress=False,
+               fingerprint=False, minify=False, working_set=WORKING_SET):
+    """Build the complete static site.
+
+    With incremental=True, outputs whose inputs are unchanged since the last
+    build are kept as they are instead of being regenerated. With jobs > 1,
+    markdown and template rendering is spread over that many processes;
+    results are consumed in order, so output and log are the same as with
+    a single job. Posts stream through rendering and writing, with at most
+    working_set of them rendered or summarized in memory at once. A
+    RenderCache passed in is reused and updated, so repeated builds only
+    render posts that changed. With link_assets=True, assets are
+    hardlinked into the output instead of copied where possible. With
+    compress=True, precompressed sidecars are written for text outputs. With
+    fingerprint=True, assets are published under content-hashed names. With
+    minify=True, generated HTML and CSS are minified.
+    """
     print(f"Building site from {CONTENT_DIR}")
+    started = time.time()
+    load_template.cache_clear()
+    ASSET_URLS.reset(fingerprint)
+    MINIFIER.reset(minify)
+
+    CHANGES.reset()
+
+    manifest = BuildManifest.load() if incremental else None
+    if manifest is None:
+        if incremental:
+            print("No usable build manifest, doing a full build")
+        # Rebuild everything, but leave files that come out the same untouched
+        # and delete whatever the build doesn't produce afterwards
+        manifest = BuildManifest(prune=True)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    # A full build with a fresh render cache highlights every code block,
+    # so what it leaves unused in the highlight cache can go
+    prune_highlights = manifest.prune and cache is None and pygments is not None
+    if prune_highlights:
+        highlight_code.cache_clear()
+
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # Fork the workers now, before the writer threads exist: a child
+        # forked while other threads hold locks can deadlock
+        executor.submit(os.getpid).result()
+        mapper = functools.partial(bounded_map, executor, working_set)
+    else:
+        executor = None
+        mapper = map
+    WRITER.start()
+    try:
+        _build_site(manifest, mapper, cache or RenderCache(), AssetCopier(manifest, link_assets))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        # Everything below reads the output, so wait for all writes
+        WRITER.finish()
+
+    for rel_path in manifest.remove_orphans(sidecars=tuple(compressors()) if compress else ()):
+        print(f"  Removed: /{rel_path}")
+    manifest.save()
+    if prune_highlights:
+        prune_highlight_cache(started)
+    if minify:
+        if manifest.prune:
+            MINIFIER.prune()
+        print(f"Minified: {MINIFIER.summary()}")
+    if compress:
+        compress_outputs(jobs)
+    else:
+        for rel_path in remove_stale_sidecars():
+            print(f"  Removed: /{rel_path}")
+    CHANGES.save()
+    print(f"Changes: {CHANGES.summary()} (listed in {CHANGES_FILE})")
+    print(f"\nSite generated successfully in {OUTPUT_DIR}")
+
 
-    # Clean output directory
-    if OUTPUT_DIR.exists():
-        shutil.rmtree(OUTPUT_DIR)
-    OUTPUT_DIR.mkdir(parents=True)
+def _build_site(manifest, mapper, cache, assets):
+    config_fp = hash_text(config_fingerprint(), MINIFIER.enabled)
 
     # Collect all posts (including drafts)
     all_posts = collect_posts()
-    published_posts = [p for p in all_posts if not p['draft']]
-    draft_posts = [p for p in all_posts if p['draft']]
+    published_posts = [p for p in all_posts if not p.draft]
+    draft_posts = [p for p in all_posts if p.draft]
     print(f"Found {len(published_posts)} published posts, {len(draft_posts)} drafts")
+    for position, post in enumerate(published_posts):
+        post.position = position
+    pages = collect_pages()
 
-    # Generate post pages (for all posts, including drafts)
+    # Copy assets first, so that pages can link to their fingerprinted names
+    variants = ImageVariants(assets)
+    for post in all_posts:
+        copy_post_assets(post, assets, variants)
+    variants.build(mapper)
+
+    # Copy assets from content directories to matching output paths
+    # e.g., content/2025/image.webp -> public/neo/2025/image.webp
+    for content_dir in sorted({page['path'] for page in pages}):
+        dir_name = content_dir.name
+
+        for asset in content_dir.iterdir():
+            if asset.is_file() and not asset.name.endswith('.md'):
+                if assets.copy(asset, f"{dir_name}/{asset.name}"):
+                    print(f"  Copied: /{dir_name}/{asset.name}")
+
+    # Copy CSS; when minifying, write it like a generated file instead
+    if MINIFIER.enabled:
+        style = (TEMPLATES_DIR / 'style.css').read_text(encoding='utf-8')
+        css_path = ASSET_URLS.add('css/style.css', hash_text(style)) if ASSET_URLS.enabled else None
+        if build_output(manifest, css_path or 'css/style.css', hash_text(config_fp, style), lambda: style):
+            print("  Generated: /css/style.css")
+    elif assets.copy(TEMPLATES_DIR / 'style.css', 'css/style.css'):
+        print("  Copied: /css/style.css")
+    css = highlight_css()
+    css_path = ASSET_URLS.add('css/highlight.css', hash_text(css)) if ASSET_URLS.enabled else None
+    if build_output(manifest, css_path or 'css/highlight.css', config_fp, lambda: css):
+        print("  Generated: /css/highlight.css")
+
+    # Copy static files; they keep their names too, for well-known URLs like /favicon.ico
+    if STATIC_DIR.exists():
+        for item in STATIC_DIR.rglob('*'):
+            if item.is_file():
+                rel_path = item.relative_to(STATIC_DIR)
+                if assets.copy(item, rel_path.as_posix(), keep_name=True):
+                    print(f"  Copied: /{rel_path}")
+
+    if ASSET_URLS.enabled:
+        if build_output(manifest, 'asset-manifest.json', ASSET_URLS.digest(), ASSET_URLS.manifest):
+            print("  Generated: /asset-manifest.json")
+    # Pages link to the hashed names of the assets
+    config_fp = hash_text(config_fp, ASSET_URLS.digest())
+
+    # Every post is rendered once and shared by all pages that show it
+    INCLUDES.retain(all_posts)
     for post in all_posts:
-        # Create output directory for post
-        post_output_dir = OUTPUT_DIR / post['url'].strip('/')
-        post_output_dir.mkdir(parents=True, exist_ok=True)
+        post.fingerprint = post_fingerprint(post)
+    cache.retain(all_posts)
 
+    # Site feeds and the feeds of each tag, with the newest posts of each
+    tags = collect_tags(all_posts)
+    feeds = [('', SITE_TITLE, published_posts[:FEED_ITEMS])]
+    for tag, tag_posts in tags.items():
+        feeds.append((f"tags/{tag}/", f'{SITE_TITLE}: posts tagged "{tag}"', tag_posts[:FEED_ITEMS]))
+    cache.plan_feeds([post for _, _, feed_posts in feeds for post in feed_posts])
+
+    # Generate post pages (for all posts, including drafts)
+    post_template_fp = template_fingerprint('base', 'post')
+    post_tasks = []
+    for post in all_posts:
         # Find prev/next posts (only among published posts)
         prev_post = None
         next_post = None
-        if not post['draft']:
-            idx = published_posts.index(post)
+        if not post.draft:
+            idx = post.position
             # Posts are sorted newest first, so "prev" is newer (idx-1) and "next" is older (idx+1)
             if idx > 0:
                 prev_post = published_posts[idx - 1]
             if idx < len(published_posts) - 1:
                 next_post = published_posts[idx + 1]
 
-        # Generate and write post HTML
-        post_html = generate_post_page(post, prev_post, next_post)
-        with open(post_output_dir / 'index.html', 'w', encoding='utf-8') as f:
-            f.write(post_html)
-
-        # Copy assets
-        copy_post_assets(post, post_output_dir)
-        print(f"  Generated: {post['url']}")
-
-    # Generate home pages with pagination (only published posts)
-    total_pages = (len(published_posts) + POSTS_PER_PAGE - 1) // POSTS_PER_PAGE
-    total_pages = max(1, total_pages)
-
-    for page_num in range(1, total_pages + 1):
-        start_idx = (page_num - 1) * POSTS_PER_PAGE
-        end_idx = start_idx + POSTS_PER_PAGE
-        page_posts = published_posts[start_idx:end_idx]
-
-        home_html = generate_home_page(page_posts, page_num, total_pages)
-
+        fingerprint = hash_text(
+            config_fp, post_template_fp, post.fingerprint,
+            *((p.url, p.title) if p else None for p in (prev_post, next_post)),
+        )
+        rel_path = f"{post.url.strip('/')}/index.html"
+        if not manifest.keep(rel_path, fingerprint):
+            post_tasks.append((rel_path, fingerprint, post, prev_post, next_post))
+    WRITER.prepare(task[0] for task in post_tasks)
+
+    # Generate and write post HTML
+    results = mapper(
+        render_post_task,
+        [task[2] for task in post_tasks],
+        [task[3] for task in post_tasks],
+        [task[4] for task in post_tasks],
+    )
+    for (rel_path, fingerprint, post, _, _), (post_html, html_content, seconds) in zip(post_tasks, results):
+        PROFILER.page(post.url, seconds)
+        write_output(rel_path, post_html)
+        manifest.record(rel_path, fingerprint, built=True)
+        # Keep only what listing pages, feeds and search need
+        cache.store(post, html_content)
+        cache.summarize(post)
+        print(f"  Generated: {post.url}")
+
+    # Plan home pages with pagination (only published posts), tag pages
+    # and year archives, each page assembled from cached post previews
+    listings = []
+    home_template_fp = template_fingerprint('base', 'home')
+    for page_num, total_pages, page_posts in paginate(published_posts, POSTS_PER_PAGE):
+        fingerprint = hash_text(
+            config_fp, home_template_fp, page_num, total_pages,
+            *(p.fingerprint for p in page_posts),
+        )
         if page_num == 1:
             # First page is at root
-            with open(OUTPUT_DIR / 'index.html', 'w', encoding='utf-8') as f:
-                f.write(home_html)
-            print(f"  Generated: / (home)")
+            rel_path, label = 'index.html', '/ (home)'
         else:
             # Other pages in /page/N/
-            page_dir = OUTPUT_DIR / 'page' / str(page_num)
-            page_dir.mkdir(parents=True, exist_ok=True)
-            with open(page_dir / 'index.html', 'w', encoding='utf-8') as f:
-                f.write(home_html)
-            print(f"  Generated: /page/{page_num}/")
+            rel_path, label = f"page/{page_num}/index.html", f"/page/{page_num}/"
+        render = lambda page_posts=page_posts, page_num=page_num, total_pages=total_pages: \
+            generate_home_page(page_posts, page_num, total_pages, cache)
+        listings.append((rel_path, fingerprint, page_posts, render, label))
 
-    # Generate tag pages
-    tags = collect_tags(all_posts)
+    listing_template_fp = template_fingerprint('base')
     if tags:
         print(f"Found {len(tags)} tags: {', '.join(sorted(tags.keys()))}")
         for tag, tag_posts in tags.items():
-            tag_dir = OUTPUT_DIR / 'tags' / tag
-            tag_dir.mkdir(parents=True, exist_ok=True)
-            tag_html = generate_tag_page(tag, tag_posts)
-            with open(tag_dir / 'index.html', 'w', encoding='utf-8') as f:
-                f.write(tag_html)
-            print(f"  Generated: /tags/{tag}/")
+            for page_num, total_pages, page_posts in paginate(tag_posts, POSTS_PER_PAGE):
+                fingerprint = hash_text(
+                    config_fp, listing_template_fp, tag, page_num, total_pages, len(tag_posts),
+                    *(p.fingerprint for p in page_posts),
+                )
+                page_path = page_dir(f"tags/{tag}/", page_num)
+                render = lambda tag=tag, page_posts=page_posts, page_num=page_num, \
+                        total_pages=total_pages, count=len(tag_posts): \
+                    generate_tag_page(tag, page_posts, page_num, total_pages, count, cache)
+                listings.append((f"{page_path}index.html", fingerprint, page_posts, render, f"/{page_path}"))
+
+    years = collect_years(published_posts)
+    for year, year_posts in years.items():
+        for page_num, total_pages, page_posts in paginate(year_posts, POSTS_PER_PAGE):
+            fingerprint = hash_text(
+                config_fp, listing_template_fp, year, page_num, total_pages, len(year_posts),
+                *years, *(p.fingerprint for p in page_posts),
+            )
+            page_path = page_dir(f"archive/{year}/", page_num)
+            render = lambda year=year, page_posts=page_posts, page_num=page_num, \
+                    total_pages=total_pages, count=len(year_posts): \
+                generate_archive_page(year, page_posts, page_num, total_pages, count, list(years), cache)
+            listings.append((f"{page_path}index.html", fingerprint, page_posts, render, f"/{page_path}"))
+
+    fingerprint = hash_text(
+        config_fp, template_fingerprint('base', 'page'),
+        *(f"{year}:{len(year_posts)}" for year, year_posts in years.items()),
+    )
+    if build_output(manifest, 'archive/index.html', fingerprint, lambda: generate_archive_index(years)):
+        print("  Generated: /archive/")
+
+    for page_path, title, feed_posts in feeds:
+        fingerprint = hash_text(config_fp, title, *(p.fingerprint for p in feed_posts))
+        for name, generate in FEED_FORMATS:
+            render = lambda generate=generate, feed_posts=feed_posts, title=title, page_path=page_path: \
+                generate(feed_posts, cache, title, page_path)
+            listings.append((f"{page_path}{name}", fingerprint, feed_posts, render, f"/{page_path}{name}"))
+
+    # Render the excerpts of all stale listings at once, then assemble them
+    listings = [entry for entry in listings if not manifest.keep(entry[0], entry[1])]
+    WRITER.prepare(entry[0] for entry in listings)
+    cache.prefetch_excerpts([post for entry in listings for post in entry[2]], mapper)
+    for rel_path, fingerprint, _, render, label in listings:
+        start = time.perf_counter()
+        html = render()
+        PROFILER.page(label, time.perf_counter() - start)
+        write_output(rel_path, html)
+        manifest.record(rel_path, fingerprint, built=True)
+        print(f"  Generated: {label}")
+
+    # Generate the search index and page
+    fingerprint = hash_text(config_fp, SEARCH_INDEX_VERSION, *(p.fingerprint for p in published_posts))
+    if not manifest.keep_group('search/index/', fingerprint):
+        terms = load_search_terms(published_posts, cache, mapper)
+        count = 0
+        with PROFILER.phase('search index'):
+            for rel_path, text in generate_search_index(published_posts, terms):
+                write_output(f"search/index/{rel_path}", text)
+                manifest.record(f"search/index/{rel_path}", fingerprint, built=True)
+                count += 1
+        print(f"  Generated: /search/ index ({count} files)")
+    fingerprint = hash_text(config_fp, template_fingerprint('base', 'search'))
+    if build_output(manifest, 'search/index.html', fingerprint, generate_search_page):
+        print("  Generated: /search/")
 
     # Generate content pages from other directories
-    pages = collect_pages()
-    content_dirs_processed = set()
+    page_template_fp = template_fingerprint('base', 'page')
+    page_tasks = []
 
     for page in pages:
-        html_content = render_markdown(page['body'])
-
         # Determine which nav item to highlight
         nav_key = f"nav_{page['path'].name}"
-        active_nav = nav_key if nav_key in ["nav_projects", "nav_guides"] else ""
-
-        page_html = generate_static_page(
-            page['title'],
-            html_content,
-            active_nav
-        )
-
-        # Create output directory
-        page_output_dir = OUTPUT_DIR / page['url'].strip('/')
-        page_output_dir.mkdir(parents=True, exist_ok=True)
-
-        with open(page_output_dir / 'index.html', 'w', encoding='utf-8') as f:
-            f.write(page_html)
+        active_nav = nav_key if nav_key == "nav_projects" else ""
+
+        fingerprint = hash_text(config_fp, page_template_fp, page['title'], active_nav, page['body'])
+        rel_path = f"{page['url'].strip('/')}/index.html"
+        if not manifest.keep(rel_path, fingerprint):
+            page_tasks.append((rel_path, fingerprint, page, active_nav))
+
+    results = mapper(
+        render_page_task,
+        [task[2]['title'] for task in page_tasks],
+        [task[2]['body'] for task in page_tasks],
+        [task[3] for task in page_tasks],
+    )
+    for (rel_path, fingerprint, page, _), (page_html, seconds) in zip(page_tasks, results):
+        PROFILER.page(page['url'], seconds)
+        write_output(rel_path, page_html)
+        manifest.record(rel_path, fingerprint, built=True)
         print(f"  Generated: {page['url']}")
 
-        # Track which content directories we've seen
-        content_dirs_processed.add(page['path'])
-
-    # Copy assets from content directories to matching output paths
-    # e.g., content/2025/image.webp -> public/neo/2025/image.webp
-    for content_dir in content_dirs_processed:
-        dir_name = content_dir.name
-        output_asset_dir = OUTPUT_DIR / dir_name
-        output_asset_dir.mkdir(parents=True, exist_ok=True)
-
-        for asset in content_dir.iterdir():
-            if asset.is_file() and not asset.name.endswith('.md'):
-                shutil.copy2(asset, output_asset_dir / asset.name)
-                print(f"  Copied: /{dir_name}/{asset.name}")
-
     # Generate placeholder for projects if not in content
     if not (CONTENT_ROOT / 'projects').exists():
-        projects_html = generate_static_page("Projects", "<p>Projects coming soon.</p>", "nav_projects")
-        projects_dir = OUTPUT_DIR / 'projects'
-        projects_dir.mkdir(parents=True, exist_ok=True)
-        with open(projects_dir / 'index.html', 'w', encoding='utf-8') as f:
-            f.write(projects_html)
-        print("  Generated: /projects/ (placeholder)")
-
-    # Copy CSS
-    css_dir = OUTPUT_DIR / 'css'
-    css_dir.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(TEMPLATES_DIR / 'style.css', css_dir / 'style.css')
-    print("  Copied: /css/style.css")
-
-    # Copy static files
-    if STATIC_DIR.exists():
-        for item in STATIC_DIR.rglob('*'):
-            if item.is_file():
-                rel_path = item.relative_to(STATIC_DIR)
-                dest = OUTPUT_DIR / rel_path
-                dest.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(item, dest)
-                print(f"  Copied: /{rel_path}")
-
-    # Generate RSS feed
-    rss_content = generate_rss(published_posts)
-    with open(OUTPUT_DIR / 'feed.xml', 'w', encoding='utf-8') as f:
-        f.write(rss_content)
-    print("  Generated: /feed.xml")
+        fingerprint = hash_text(config_fp, page_template_fp)
+        if build_output(manifest, 'projects/index.html', fingerprint,
+                        lambda: generate_static_page("Projects", "<p>Projects coming soon.</p>", "nav_projects")):
+            print("  Generated: /projects/ (placeholder)")
+
+    print(f"Render cache: {cache.stats()}")
+    print(f"Includes: {INCLUDES.stats()}")
+    if Image is not None:
+        print(f"Images: {variants.summary()}")
+    print(f"Outputs: {manifest.built} written, {manifest.skipped} up to date")
+    print(f"Assets: {assets.summary()}")
+
+
+def watch_snapshot():
+    """Modification times of all files the site is built from."""
+    snapshot = {}
+    for directory in (CONTENT_ROOT, STATIC_DIR, TEMPLATES_DIR):
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for name in filenames:
+                # Skip editor swap and backup files
+                if name.startswith('.') or name.endswith(('~', '.swp')):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVE_RELOAD_PATH}")'
+    '.onmessage = function () { location.reload(); };</script>'
+)
+
+
+class LiveReload:
+    """Build counter that live-reload clients wait on."""
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Wait for a build after the given one. Returns the current generation."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    """Serves OUTPUT_DIR, injecting the live-reload client into HTML pages."""
+
+    live_reload = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=str(OUTPUT_DIR), **kwargs)
+
+    def translate_path(self, path):
+        # Pages link to BASE_PATH-prefixed URLs, but OUTPUT_DIR is the site root
+        if BASE_PATH and path.startswith(BASE_PATH + '/'):
+            path = path[len(BASE_PATH):]
+        return super().translate_path(path)
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            self.send_events()
+            return
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and self.path.split('?')[0].endswith('/'):
+            path = path / 'index.html'
+        if path.suffix != '.html' or not path.is_file():
+            super().do_GET()
+            return
+        page = path.read_text(encoding='utf-8')
+        if '</body>' in page:
+            page = page.replace('</body>', LIVE_RELOAD_SCRIPT + '</body>', 1)
+        else:
+            page += LIVE_RELOAD_SCRIPT
+        body = page.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        """Stream a server-sent event to the page after every rebuild."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        generation = self.live_reload.generation
+        try:
+            while True:
+                current = self.live_reload.wait(generation, timeout=15)
+                if current != generation:
+                    generation = current
+                    self.wfile.write(b'data: reload\n\n')
+                else:
+                    # Keepalive, also notices clients that went away
+                    self.wfile.write(b': ping\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host, port, watch=False, jobs=1, link_assets=False, working_set=WORKING_SET, interval=0.2):
+    """Build the site and serve OUTPUT_DIR, rebuilding on changes if watching.
+
+    Rebuilds are incremental and reuse one RenderCache, so an edit only
+    re-renders the outputs whose inputs changed: the edited post, the
+    neighbours whose prev/next links show its title, its tag pages, the home
+    pages and feeds, and the posts that include an edited fragment.
+    """
+    cache = RenderCache()
+    build = functools.partial(build_site, incremental=True, jobs=jobs, cache=cache,
+                              link_assets=link_assets, working_set=working_set)
+    build()
+
+    live_reload = LiveReload()
+    handler = type('Handler', (DevRequestHandler,), {'live_reload': live_reload})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {OUTPUT_DIR} at http://{host}:{port}{BASE_PATH}/")
+
+    try:
+        if not watch:
+            threading.Event().wait()
+        print(f"Watching {CONTENT_ROOT}, {STATIC_DIR} and {TEMPLATES_DIR} for changes")
+        snapshot = watch_snapshot()
+        while True:
+            time.sleep(interval)
+            current = watch_snapshot()
+            if current == snapshot:
+                continue
+            changed = sorted(set(current.items()) ^ set(snapshot.items()))
+            snapshot = current
+            for path in sorted({path for path, _ in changed}):
+                print(f"Changed: {os.path.relpath(path, ROOT_DIR)}")
+                for index_file in INCLUDES.invalidate(path):
+                    print(f"  Included by: {os.path.relpath(index_file, ROOT_DIR)}")
+            start = time.perf_counter()
+            try:
+                build()
+            except Exception:
+                # Keep serving; the next save will most likely fix it
+                traceback.print_exc()
+                continue
+            print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms")
+            live_reload.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+def profile_build(build, jobs=1, output=None):
+    """Run build with the profiler enabled and report the results."""
+    PROFILER.enabled = True
+    profile = cProfile.Profile() if output and not output.endswith('.json') else None
+    start = time.perf_counter()
+    if profile:
+        profile.enable()
+    try:
+        build()
+    finally:
+        if profile:
+            profile.disable()
+        PROFILER.enabled = False
+    wall_time = time.perf_counter() - start
+
+    PROFILER.report(wall_time)
+    if jobs > 1:
+        print("Note: phases that ran in worker processes are not included above")
+    if profile:
+        profile.dump_stats(output)
+        print(f"cProfile stats written to {output}")
+    elif output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(PROFILER.results(wall_time, slowest=len(PROFILER.pages)), f, indent=2)
+        print(f"Profile written to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Build the {SITE_TITLE} static site.")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="only rebuild outputs whose inputs changed since the last build",
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1, metavar='N',
+        help="render pages in N processes (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        '--working-set', type=int, default=WORKING_SET, metavar='N',
+        help=f"keep at most N rendered posts in memory (default: {WORKING_SET})",
+    )
+    parser.add_argument(
+        '--link-assets', action='store_true',
+        help="hardlink assets into the output instead of copying them",
+    )
+    parser.add_argument(
+        '--compress', action='store_true',
+        help="write precompressed .gz (and .br/.zst if available) copies of text outputs",
+    )
+    parser.add_argument(
+        '--fingerprint', action='store_true',
+        help="publish assets under content-hashed names and write asset-manifest.json",
+    )
+    parser.add_argument(
+        '--minify', action='store_true',
+        help="minify generated HTML and CSS",
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="report time per build phase, the slowest pages and peak memory",
+    )
+    parser.add_argument(
+        '--profile-output', metavar='FILE',
+        help="profile and also write the results as JSON (*.json) or cProfile stats (other names)",
+    )
+    commands = parser.add_subparsers(dest='command')
+    serve_parser = commands.add_parser('serve', help="build the site and serve it locally")
+    serve_parser.add_argument(
+        '--watch', action='store_true',
+        help="rebuild on changes and live-reload open pages",
+    )
+    serve_parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    serve_parser.add_argument('--port', type=int, default=8000, help="port to listen on")
+    commands.add_parser(
+        'check', help="build the site, then check its internal links, assets and anchors offline",
+    )
+    args = parser.parse_args()
+    if args.working_set < 1:
+        parser.error("--working-set must be at least 1")
+    jobs = args.jobs or os.cpu_count()
+    build = functools.partial(
+        build_site,
+        incremental=args.incremental,
+        jobs=jobs,
+        link_assets=args.link_assets,
+        compress=args.compress,
+        fingerprint=args.fingerprint,
+        minify=args.minify,
+        working_set=args.working_set,
+    )
 
-    print(f"\nSite generated successfully in {OUTPUT_DIR}")
+    if args.command == 'serve':
+        serve(args.host, args.port, watch=args.watch, jobs=jobs, link_assets=args.link_assets,
+              working_set=args.working_set)
+    elif args.command == 'check':
+        build()
+        if check_site(jobs):
+            sys.exit(1)
+    elif args.profile or args.profile_output:
+        profile_build(build, jobs, args.profile_output)
+    else:
+        build()
 
 
 if __name__ == '__main__':
-    build_site()
+    main()